@@ -1,9 +1,181 @@
 # books.py
 import matching_engine
 import asyncio
+import os
+import queue
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Per-symbol engine config: price/quantity granularity (the engine matches in
+# integer ticks/lots), how many ticks around the touch to keep in the dense
+# price ladder (0 = tree only) and how many recent trades and level deltas to
+# retain
+symbol_specs: dict[str, dict] = {
+    "BTC-USD": {
+        "tick_size": 0.01,
+        "lot_size": 1e-8,
+        "ladder_levels": 32768,
+        "trade_history": 100000,
+        "delta_history": 65536,
+    },
+}
 
 # Shared dict: symbol -> OrderBook
 order_books: dict[str, matching_engine.OrderBook] = {}
 
 # Async lock per symbol for thread-safety
 locks: dict[str, asyncio.Lock] = {}
+
+
+def get_or_create_book(symbol: str) -> matching_engine.OrderBook:
+    """Return the book for `symbol`, creating it with its tick/lot config on first use."""
+    book = order_books.get(symbol)
+    if book is None:
+        book = matching_engine.OrderBook(symbol, **symbol_specs.get(symbol, {}))
+        order_books[symbol] = book
+    return book
+
+
+class BookNotifier:
+    """Wakes asyncio listeners when a book changes.
+
+    The engine signals the book's change fd once per arm, from whichever
+    thread mutated the book, and the loop watches it with add_reader, so no
+    Python runs on the matching path. Only the notifier arms, re-arming
+    before it wakes the listeners, so every listener sees every change no
+    matter how many share the book. An idle or unwatched book costs nothing
+    and a busy one at most one wakeup per loop iteration.
+    """
+
+    def __init__(self, book: matching_engine.OrderBook, loop: asyncio.AbstractEventLoop):
+        self.book = book
+        self.loop = loop
+        self.listeners: set[asyncio.Event] = set()
+        self.fd = book.change_fd
+        loop.add_reader(self.fd, self._wake)
+
+    def _wake(self):
+        # Consume the signal so the reader doesn't fire again until the
+        # next armed change
+        try:
+            os.read(self.fd, 8)
+        except BlockingIOError:
+            pass
+        if not self.listeners:
+            return
+        # Arm before waking: a listener reads book.version after this, so a
+        # change it doesn't see signals the fd again
+        self.book.arm_change_callback()
+        for event in self.listeners:
+            event.set()
+
+    def add_listener(self, event: asyncio.Event):
+        """Set `event` on every change from now on.
+
+        The listener should compare book.version after adding itself, since
+        changes before the call are not signalled.
+        """
+        if not self.listeners:
+            self.book.arm_change_callback()
+        self.listeners.add(event)
+
+    def remove_listener(self, event: asyncio.Event):
+        self.listeners.discard(event)
+
+    def close(self):
+        """Stop watching the book's fd. Safe to call from another loop."""
+        if not self.loop.is_closed():
+            self.loop.call_soon_threadsafe(self.loop.remove_reader, self.fd)
+
+
+# Symbol -> notifier, created on first use from the event loop
+notifiers: dict[str, BookNotifier] = {}
+
+
+def get_notifier(symbol: str) -> BookNotifier | None:
+    """Return the change notifier for an existing book, or None if there is no book.
+
+    A notifier watches the book's fd from one event loop, so it is rebuilt
+    when called from a different one.
+    """
+    book = order_books.get(symbol)
+    if book is None:
+        return None
+    loop = asyncio.get_running_loop()
+    notifier = notifiers.get(symbol)
+    if notifier is None or notifier.book is not book or notifier.loop is not loop:
+        if notifier is not None:
+            notifier.close()
+        notifier = notifiers[symbol] = BookNotifier(book, loop)
+    return notifier
+
+
+class BookWorker:
+    """Dedicated matching thread for one book.
+
+    Order entry from the event loop goes onto an inbound queue
+    (queue.SimpleQueue, safe for many producers) and `submit` returns an
+    asyncio future. The thread runs requests one at a time in arrival order
+    and completes each future through call_soon_threadsafe. The engine
+    releases the GIL while matching, so a deep sweep no longer stalls the
+    event loop, and books for different symbols match in parallel.
+    """
+
+    def __init__(self, symbol: str, book: matching_engine.OrderBook):
+        self.book = book
+        self.queue: queue.SimpleQueue = queue.SimpleQueue()
+        self.thread = threading.Thread(target=self._run, name=f"engine-{symbol}", daemon=True)
+        self.thread.start()
+
+    def submit(self, request, *args) -> asyncio.Future:
+        """Run request(book, *args) on the matching thread; await its result."""
+        future = asyncio.get_running_loop().create_future()
+        self.queue.put((future, request, args))
+        return future
+
+    def close(self):
+        """Stop the thread once the requests already queued have run."""
+        self.queue.put(None)
+        self.thread.join()
+
+    def _run(self):
+        # Nothing may escape this loop: a dead thread would leave every later
+        # submit for the symbol waiting forever
+        while True:
+            item = self.queue.get()
+            if item is None:
+                return
+            future, request, args = item
+            try:
+                result, error = request(self.book, *args), None
+            except BaseException as e:
+                result, error = None, e
+            try:
+                future.get_loop().call_soon_threadsafe(_complete, future, result, error)
+            except RuntimeError:
+                # The awaiting event loop has been closed
+                logger.warning("Dropping result of %s: its event loop is closed", getattr(request, "__name__", request))
+
+
+def _complete(future: asyncio.Future, result, error: BaseException | None):
+    # The awaiting request may have been cancelled (client went away)
+    if future.cancelled():
+        return
+    if error is not None:
+        future.set_exception(error)
+    else:
+        future.set_result(result)
+
+
+# Symbol -> matching thread
+workers: dict[str, BookWorker] = {}
+
+
+def get_worker(symbol: str) -> BookWorker:
+    """Return the matching thread for `symbol`, creating it and the book on first use."""
+    worker = workers.get(symbol)
+    if worker is None:
+        worker = workers[symbol] = BookWorker(symbol, get_or_create_book(symbol))
+    return worker
@@ -1,38 +1,244 @@
 import asyncio
+import json
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
-from app.books.books import order_books
+from app.books.books import get_notifier
+from app.utils.outbox import Outbox
 import logging
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
-clients = set()
+SNAPSHOT_DEPTH = 5
+MIN_PUBLISH_INTERVAL = 0.0  # Optional throttle: minimum seconds between frames
+MAX_PENDING_DELTA_FRAMES = 64  # Per subscriber; beyond this it is resynced from a book frame
+SIDE_NAMES = ("BUY", "SELL")
+
+
+class Publisher:
+    """Sends frames built once per change to every subscriber of a symbol.
+
+    The task sleeps until the engine reports a change to the book (or a new
+    subscriber arrives), so an idle book costs nothing. Changes that land
+    while a frame is being sent, or within MIN_PUBLISH_INTERVAL, are folded
+    into the next frame. The task runs only while there are subscribers.
+    Frames go through each subscriber's Outbox, so publishing never waits
+    on a client. Subclasses implement `_publish` and may override
+    `_outbox`.
+    """
+
+    def __init__(self, symbol: str):
+        self.symbol = symbol
+        self.subscribers: dict[WebSocket, Outbox] = {}
+        self.synced: set[WebSocket] = set()  # Subscribers that got their first frame
+        self.version: int | None = None  # Book version last published
+        self.wakeup = asyncio.Event()
+        self.task: asyncio.Task | None = None
+
+    def subscribe(self, websocket: WebSocket):
+        if self.task is not None and self.task.get_loop() is not asyncio.get_running_loop():
+            # Left over from an event loop that has since gone away
+            self.subscribers.clear()
+            self.task = None
+            self._reset()
+        self.subscribers[websocket] = self._outbox(websocket)
+        self.wakeup.set()
+        if self.task is None or self.task.done():
+            self.task = asyncio.create_task(self._run())
+
+    def unsubscribe(self, websocket: WebSocket):
+        outbox = self.subscribers.pop(websocket, None)
+        if outbox is not None:
+            outbox.close()
+        self.synced.discard(websocket)
+        if not self.subscribers and self.task is not None:
+            self.task.cancel()
+            self.task = None
+            self._reset()
+
+    def _outbox(self, websocket: WebSocket) -> Outbox:
+        return Outbox(websocket, conflate=True)
+
+    def _reset(self):
+        """Drop per-stream state once the last subscriber has left."""
+        self.synced.clear()
+        self.version = None
+
+    async def _run(self):
+        notifier = get_notifier(self.symbol)
+        if notifier is None:
+            logger.error("Order book for %s not found", self.symbol)
+            await asyncio.gather(*(outbox.disconnect() for outbox in self.subscribers.values()))
+            self.subscribers.clear()
+            return
+
+        book = notifier.book
+        loop = asyncio.get_running_loop()
+        # Events bind to the loop that first waits on them; each run gets its own
+        self.wakeup = asyncio.Event()
+        last_publish = float("-inf")
+        notifier.add_listener(self.wakeup)
+        try:
+            while self.subscribers:
+                self.wakeup.clear()
+                if book.version == self.version and self.subscribers.keys() <= self.synced:
+                    await self.wakeup.wait()
+                    continue
+
+                # Always yield here so outboxes drain even when the book
+                # changes faster than frames can be built
+                delay = last_publish + MIN_PUBLISH_INTERVAL - loop.time()
+                await asyncio.sleep(max(delay, 0))
+
+                self.version = book.version
+                subscribers = list(self.subscribers)
+                joining = [ws for ws in subscribers if ws not in self.synced]
+                self.synced.update(joining)
+                self._publish(book, subscribers, joining)
+                last_publish = loop.time()
+        finally:
+            notifier.remove_listener(self.wakeup)
+
+    def _publish(self, book, subscribers: list[WebSocket], joining: list[WebSocket]):
+        """Queue what changed for `subscribers`; `joining` have had nothing yet."""
+        raise NotImplementedError
+
+
+class SnapshotPublisher(Publisher):
+    """Top-of-book snapshot whenever it changes: {"snapshot": {...}}."""
+
+    def __init__(self, symbol: str):
+        super().__init__(symbol)
+        self.top_version: int | None = None
+        self.frame: tuple[int, str] | None = None  # (top_version, text frame)
+
+    def _reset(self):
+        super()._reset()
+        self.top_version = None
+        self.frame = None
+
+    def _publish(self, book, subscribers, joining):
+        # Changes deeper than the published top of book don't alter the frame
+        top_version = book.top_version
+        targets = subscribers if top_version != self.top_version else joining
+        self.top_version = top_version
+        if not targets:
+            return
+
+        if self.frame is None or self.frame[0] != top_version:
+            # Serialized once in C++ per book version and decoded once here;
+            # sent as a text frame {"snapshot": ...}
+            snapshot = book.get_snapshot_bytes(SNAPSHOT_DEPTH, "json")
+            self.frame = (top_version, '{"snapshot":' + snapshot.decode() + '}')
+        frame = self.frame[1]
+        for ws in targets:
+            self.subscribers[ws].put(frame)  # Latest snapshot wins
+
+
+class DeltaPublisher(Publisher):
+    """Full-depth book followed by level deltas.
+
+    A subscriber first gets {"book": {"seq", "bids", "asks"}} and then
+    {"deltas": [{"seq", "side", "price", "quantity"}, ...]} whenever levels
+    change. Deltas carry consecutive sequence numbers; those with seq <= the
+    book's seq are already reflected in it, and quantity 0 removes a level.
+    If the engine's delta history is overrun, or a subscriber falls more
+    than MAX_PENDING_DELTA_FRAMES behind, a new "book" frame is sent and
+    replaces the client's book.
+    """
+
+    def __init__(self, symbol: str):
+        super().__init__(symbol)
+        self.seq: int | None = None  # Last delta sent
+
+    def _outbox(self, websocket: WebSocket) -> Outbox:
+        return Outbox(websocket, limit=MAX_PENDING_DELTA_FRAMES)
+
+    def _reset(self):
+        super()._reset()
+        self.seq = None
+
+    def _publish(self, book, subscribers, joining):
+        # The book frame is taken before the deltas are read, so the deltas
+        # sent alongside it always reach back to its seq
+        book_frame = None
+        if joining or self.seq is None:
+            seq, book_frame = self._book_frame(book)
+            if self.seq is None:
+                self.seq = seq
+
+        delta_frame = None
+        deltas = book.deltas_since(self.seq)
+        if deltas is None:
+            logger.warning("Delta history overrun for %s; resyncing subscribers", self.symbol)
+            self.seq, book_frame = self._book_frame(book)
+            joining = subscribers
+        elif len(deltas):
+            self.seq = int(deltas["seq"][-1])
+            delta_frame = json.dumps({"deltas": [
+                {"seq": seq, "side": SIDE_NAMES[side], "price": price, "quantity": quantity}
+                for seq, side, price, quantity in deltas.tolist()
+            ]}, separators=(",", ":"))
+
+        joined = set(joining)
+        for ws in subscribers:
+            frames = [book_frame] if ws in joined else []
+            if delta_frame is not None:
+                frames.append(delta_frame)
+            if frames and not self.subscribers[ws].put(*frames):
+                # Too far behind: drop its backlog and resync it from the
+                # newest book state on the next pass
+                logger.warning("Client %s fell behind on %s deltas; resyncing", ws.client, self.symbol)
+                self.subscribers[ws].clear()
+                joined.discard(ws)
+                self.synced.discard(ws)
+                self.wakeup.set()
+
+    @staticmethod
+    def _book_frame(book) -> tuple[int, str]:
+        seq, bids, asks = book.get_levels()
+        frame = json.dumps(
+            {"book": {"seq": seq, "bids": bids.tolist(), "asks": asks.tolist()}},
+            separators=(",", ":"),
+        )
+        return seq, frame
+
+
+# (symbol, mode) -> publisher
+publishers: dict[tuple[str, str], Publisher] = {}
+PUBLISHER_TYPES = {"snapshot": SnapshotPublisher, "delta": DeltaPublisher}
+
+
+def get_publisher(symbol: str, mode: str) -> Publisher:
+    publisher = publishers.get((symbol, mode))
+    if publisher is None:
+        publisher = publishers[(symbol, mode)] = PUBLISHER_TYPES[mode](symbol)
+    return publisher
+
 
 @router.websocket("/marketdata")
 async def get_market_data(websocket: WebSocket):
+    """Stream market data: top-5 snapshots (default) or, with ?mode=delta,
+    a full book followed by sequenced level deltas."""
+    mode = websocket.query_params.get("mode", "snapshot")
+    if mode not in PUBLISHER_TYPES:
+        await websocket.close(code=1008, reason="Invalid mode.")
+        return
+
     await websocket.accept()
-    clients.add(websocket)
-    logger.info("Client connected: %s", websocket.client)
+    publisher = get_publisher("BTC-USD", mode)
+    publisher.subscribe(websocket)
+    logger.info("Client connected: %s (%s)", websocket.client, mode)
 
+    # Frames come from the publisher; this handler only waits for the
+    # client to go away
     try:
         while True:
-            await asyncio.sleep(0.05)  # Send updates every 50ms
-            book = order_books.get("BTC-USD")
-            if not book:
-                logger.error("Order book for BTC-USD not found")
-                await websocket.close()
-                clients.discard(websocket)
-                return
-
-            snapshot = book.get_snapshot(5)
-            msg = {"snapshot": snapshot}
-
-          
-            await websocket.send_json(msg)
-            
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(message.get("code", 1000))
     except WebSocketDisconnect:
-        clients.discard(websocket)
         logger.info("Client disconnected: %s", websocket.client)
     except Exception as e:
-        clients.discard(websocket)
         logger.error("WebSocket error for client %s: %s", websocket.client, e)
+    finally:
+        publisher.unsubscribe(websocket)
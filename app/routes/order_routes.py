@@ -1,11 +1,20 @@
 from fastapi import APIRouter, Request
-from app.books.books import order_books
+from app.books.books import order_books, symbol_specs, get_worker
 import matching_engine
+import numpy as np
 import logging
+import math
 
 router = APIRouter()
 logger = logging.getLogger(__name__) 
 
+# Engine enums by request name; add_orders takes their integer codes
+SIDES = dict(matching_engine.Side.__members__)
+ORDER_TYPES = dict(matching_engine.OrderType.__members__)
+SIDE_CODES = {name: int(value) for name, value in SIDES.items()}
+ORDER_TYPE_CODES = {name: int(value) for name, value in ORDER_TYPES.items()}
+MAX_UNITS = 2 ** 53  # Largest tick/lot count the engine accepts
+
 @router.post("/orders")
 async def submit_order(order_request: Request):
     try:
@@ -13,10 +22,7 @@ async def submit_order(order_request: Request):
 
         # Handle batch orders
         if isinstance(body, list):
-            results = []
-            for order in body:
-                result = await _process_single_order(order)
-                results.append(result)
+            results = await _process_batch(body)
             return {"status": "success", "orders": results}
 
         # Handle single order
@@ -32,8 +38,11 @@ async def submit_order(order_request: Request):
         logger.error("Error processing order: %s, exception: %s", body, e, exc_info=True)
         return {"status": "error", "message": str(e)}
 
-async def _process_single_order(order: dict):
-    """Validate and submit a single order to the matching engine."""
+def _parse_order(order: dict):
+    """Validate an order request.
+
+    Returns (symbol, side, order_type, price, quantity) or an error response.
+    """
     symbol = order.get("symbol")
     side = order.get("side", "").upper()
     order_type = order.get("order_type", "").upper()
@@ -44,19 +53,126 @@ async def _process_single_order(order: dict):
     if symbol != "BTC-USD":
         logger.warning("Invalid or missing symbol: %s", order)
         return {"status": "error", "message": "Invalid or missing symbol."}
-    if price <= 0 or quantity <= 0:
+    if not (math.isfinite(price) and math.isfinite(quantity)) or price <= 0 or quantity <= 0:
         logger.warning("Invalid order parameters: %s", order)
         return {"status": "error", "message": "Price and quantity must be positive numbers."}
-    if order_type not in ["LIMIT", "MARKET", "IOC", "FOK"]:
+    if not _fits_spec(symbol, price, quantity):
+        logger.warning("Order outside tick/lot range: %s", order)
+        return {"status": "error", "message": "Price or quantity is outside the symbol's tick/lot range."}
+    if order_type not in ORDER_TYPES:
         logger.warning("Invalid order type: %s", order)
         return {"status": "error", "message": "Invalid order type."}
-    if side not in ["BUY", "SELL"]:
+    if side not in SIDES:
         logger.warning("Invalid order side: %s", order)
         return {"status": "error", "message": "Invalid order side."}
+    return symbol, side, order_type, price, quantity
+
+
+def _fits_spec(symbol: str, price: float, quantity: float) -> bool:
+    """Whether price and quantity are at least one tick and one lot and within
+    the engine's range.
+
+    The engine rejects these too, but for a batch that would fail every order.
+    """
+    spec = symbol_specs.get(symbol, {})
+    tick_size = spec.get("tick_size", 0.01)
+    lot_size = spec.get("lot_size", 1e-8)
+    return (tick_size <= price <= MAX_UNITS * tick_size
+            and lot_size / 2 <= quantity <= MAX_UNITS * lot_size)
+
 
-    # Get or create order book
-    book = order_books.setdefault(symbol, matching_engine.OrderBook(symbol))
+async def _process_batch(orders: list) -> list:
+    """Validate a batch and submit the valid orders with one add_orders call per symbol.
+
+    Results keep the request order; invalid entries get their error response.
+    """
+    results: list = [None] * len(orders)
+    by_symbol: dict[str, list] = {}
+    for i, order in enumerate(orders):
+        parsed = _parse_order(order)
+        if isinstance(parsed, dict):
+            results[i] = parsed
+        else:
+            by_symbol.setdefault(parsed[0], []).append((i, parsed))
+
+    for symbol, entries in by_symbol.items():
+        order_ids, fill_counts, _ = await get_worker(symbol).submit(
+            matching_engine.OrderBook.add_orders,
+            np.fromiter((p[3] for _, p in entries), dtype=np.float64, count=len(entries)),
+            np.fromiter((p[4] for _, p in entries), dtype=np.float64, count=len(entries)),
+            np.fromiter((SIDE_CODES[p[1]] for _, p in entries), dtype=np.uint8, count=len(entries)),
+            np.fromiter((ORDER_TYPE_CODES[p[2]] for _, p in entries), dtype=np.uint8, count=len(entries)),
+        )
+        for (i, _), order_id, fill_count in zip(entries, order_ids.tolist(), fill_counts.tolist()):
+            results[i] = {
+                "status": "success",
+                "symbol": symbol,
+                "order_id": order_id,
+                "trades_executed": fill_count,
+            }
+    return results
+
+
+async def _process_single_order(order: dict):
+    """Validate and submit a single order to the matching engine."""
+    parsed = _parse_order(order)
+    if isinstance(parsed, dict):
+        return parsed
+    symbol, side, order_type, price, quantity = parsed
 
-    # Submit order
-    trades = book.add_order(price, quantity, side, order_type)
-    return {"status": "success", "symbol": symbol, "trades_executed": len(trades)}
+    # Submit order to the symbol's matching thread
+    result = await get_worker(symbol).submit(
+        matching_engine.OrderBook.add_order, price, quantity, SIDES[side], ORDER_TYPES[order_type])
+    return {
+        "status": "success",
+        "symbol": symbol,
+        "order_id": result.order_id,
+        "trades_executed": result.trade_count,
+    }
+
+
+@router.delete("/orders/{order_id}")
+async def cancel_order(order_id: int, symbol: str = "BTC-USD"):
+    """Cancel a resting order by the ID returned at submission."""
+    if symbol not in order_books:
+        logger.warning("Cancel for unknown symbol: %s", symbol)
+        return {"status": "error", "message": "Invalid or missing symbol."}
+
+    if not await get_worker(symbol).submit(matching_engine.OrderBook.cancel_order, order_id):
+        return {"status": "error", "message": "Order not found."}
+    return {"status": "success", "symbol": symbol, "order_id": order_id}
+
+
+@router.patch("/orders/{order_id}")
+async def modify_order(order_id: int, order_request: Request):
+    """Amend the price and/or quantity of a resting order.
+
+    Reducing quantity at an unchanged price keeps queue priority; any other
+    change re-queues the order and may execute it immediately.
+    """
+    try:
+        body = await order_request.json()
+        symbol = body.get("symbol", "BTC-USD")
+        if symbol not in order_books:
+            logger.warning("Modify for unknown symbol: %s", body)
+            return {"status": "error", "message": "Invalid or missing symbol."}
+
+        price = float(body.get("price", 0))
+        quantity = float(body.get("quantity", 0))
+        if not (math.isfinite(price) and math.isfinite(quantity)) or price <= 0 or quantity <= 0:
+            logger.warning("Invalid modify parameters: %s", body)
+            return {"status": "error", "message": "Price and quantity must be positive numbers."}
+
+        trades = await get_worker(symbol).submit(matching_engine.OrderBook.modify_order, order_id, quantity, price)
+        if trades is None:
+            return {"status": "error", "message": "Order not found."}
+        return {
+            "status": "success",
+            "symbol": symbol,
+            "order_id": order_id,
+            "trades_executed": len(trades),
+        }
+
+    except Exception as e:
+        logger.error("Error modifying order %s, exception: %s", order_id, e, exc_info=True)
+        return {"status": "error", "message": str(e)}
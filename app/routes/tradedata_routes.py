@@ -1,57 +1,280 @@
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
-from app.books.books import order_books
+from app.books.books import get_or_create_book
+from app.utils.outbox import Outbox
+import matching_engine
+import numpy as np
 import asyncio
+import json
 import logging
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
-clients = set()
+TRADE_QUEUE_SIZE = 4096  # Unsent frames per client before it is disconnected
+TRADE_EVENT_CAPACITY = 65536  # Engine-side ring of trades awaiting the hub
+DRAIN_BATCH = 4096  # Trades taken from the ring per read
+MAX_BATCH_MS = 5  # Longest batching window a client may ask for
 
-@router.websocket("/trades")
-async def get_trade_data(websocket: WebSocket):
-    await websocket.accept()
-    clients.add(websocket)
-    logger.info("Client connected: %s", websocket.client)
 
-    loop = asyncio.get_event_loop()
-    book = order_books.get("BTC-USD")
-
-    # Callback for new trades
-    def on_trade(trade):
-        trade_data = {
-            "trade_id": trade.trade_id,
-            "symbol": trade.symbol,
-            "price": trade.price,
-            "quantity": trade.quantity,
-            "timestamp": trade.timestamp,
-            "maker_order_id": trade.maker_order_id,
-            "taker_order_id": trade.taker_order_id,
-            "aggressor_side": trade.aggressor_side.name,
-        }
-
-      
-        for client in clients.copy():
-            if client.client_state.name != "CONNECTED":
-                clients.discard(client)
+class TradeHub:
+    """Single fan-out point for one symbol's trades.
+
+    The engine copies every fill into a preallocated ring while matching and
+    signals an fd that the loop watches, so matching never waits on Python.
+    On each wakeup the hub drains the ring in batches, encodes every trade
+    once and queues frames in each subscriber's Outbox. Trade events are
+    enabled only while there are subscribers.
+
+    Each subscriber picks a framing: one {"trade": {...}} frame per trade
+    (batch_ms None), one {"trades": [...]} frame per loop iteration that saw
+    trades (batch_ms 0), or one {"trades": [...]} frame per batch_ms window.
+    Frames for a framing are built once and shared by its subscribers. Only
+    a client that is already behind (TRADE_QUEUE_SIZE unsent frames) when
+    trades arrive is disconnected; one large sweep is queued whole.
+
+    Every trade carries its per-symbol `seq`. A subscriber that passes
+    since_seq first gets the trades after it from the engine's trade
+    history, as {"trades": [...]} frames, and then the live stream without
+    a gap. If the history no longer reaches back that far, or the replay is
+    more than TRADE_QUEUE_SIZE frames, it gets {"gap": {"after_seq", "seq"}}
+    instead: trades after `after_seq` up to `seq` are not sent and it must
+    rebuild its state. The history also fills in trades the engine's ring
+    dropped on overflow.
+    """
+
+    def __init__(self, symbol: str):
+        self.symbol = symbol
+        self.subscribers: dict[WebSocket, Outbox] = {}
+        self.batch_ms: dict[WebSocket, int | None] = {}
+        self.pending: dict[int, list[dict]] = {}  # Window -> trades awaiting its flush
+        self.flushes: dict[int, asyncio.TimerHandle] = {}
+        self.book: matching_engine.OrderBook | None = None
+        self.loop: asyncio.AbstractEventLoop | None = None
+        self.fd: int | None = None
+        self.seq = 0  # Last trade taken off the ring
+        self.dropped = 0  # Ring overflow count already caught up on
+
+    def subscribe(self, websocket: WebSocket, batch_ms: int | None = None, since_seq: int | None = None):
+        if self.fd is not None and self.loop is not asyncio.get_running_loop():
+            # Left over from an event loop that has since gone away
+            if not self.loop.is_closed():
+                self.loop.call_soon_threadsafe(self.loop.remove_reader, self.fd)
+            self.subscribers.clear()
+            self.batch_ms.clear()
+            self.flushes.clear()
+            self.pending.clear()
+            self.fd = None
+        outbox = Outbox(websocket, limit=TRADE_QUEUE_SIZE)
+        if self.fd is None:
+            # Creates the book if no order has arrived yet, so there is
+            # always something to attach to
+            self.book = get_or_create_book(self.symbol)
+            self.loop = asyncio.get_running_loop()
+            self.fd = self.book.enable_trade_events(TRADE_EVENT_CAPACITY)
+            # Trades up to here are only in the history; any of them that
+            # also reached the ring are skipped by seq
+            self.seq = self.book.trade_seq
+            self.dropped = self.book.trade_events_dropped
+            self.loop.add_reader(self.fd, self._on_readable)
+            if not self.book.arm_trade_events():
+                self.loop.call_soon(self._on_readable)
+        else:
+            # Fan out what is already in the ring, so the live stream picks
+            # up right after self.seq
+            self._on_readable()
+        if since_seq is not None:
+            self._replay(outbox, batch_ms, since_seq)
+        self.subscribers[websocket] = outbox
+        self.batch_ms[websocket] = batch_ms
+
+    def unsubscribe(self, websocket: WebSocket):
+        outbox = self.subscribers.pop(websocket, None)
+        if outbox is not None:
+            outbox.close()
+        self.batch_ms.pop(websocket, None)
+        if not self.subscribers and self.fd is not None:
+            self.loop.remove_reader(self.fd)
+            self.book.disable_trade_events()
+            while len(self.book.drain_trade_events(DRAIN_BATCH)) == DRAIN_BATCH:
+                pass
+            for handle in self.flushes.values():
+                handle.cancel()
+            self.flushes.clear()
+            self.pending.clear()
+            self.fd = None
+
+    def _on_readable(self):
+        # Drain until the engine confirms the ring is empty with the wakeup
+        # re-armed, so a trade pushed mid-drain is never stranded
+        trades = []
+        while True:
+            batch = self.book.drain_trade_events(DRAIN_BATCH)
+            trades.extend(self._encode(self._in_sequence(batch)))
+            if len(batch) == DRAIN_BATCH:
+                continue
+            if self.book.arm_trade_events():
+                break
+
+        dropped = self.book.trade_events_dropped
+        if dropped != self.dropped:
+            # The ring overflowed; take whatever it lost from the history
+            self.dropped = dropped
+            trades.extend(self._encode(self._in_sequence(self._history_after(self.seq))))
+        self._publish(trades)
+
+    def _in_sequence(self, batch):
+        """Drop trades already streamed and fill gaps the ring left on overflow."""
+        batch = batch[batch["seq"] > self.seq]
+        if not len(batch):
+            return batch
+        last = int(batch["seq"][-1])
+        if last - self.seq != len(batch):
+            history = self._history_after(self.seq)
+            if len(history) and history["seq"][0] == self.seq + 1:
+                batch = history[history["seq"] <= last]
+        self.seq = last
+        return batch
+
+    def _history_after(self, seq: int):
+        history = self.book.trades_after(seq)
+        if history is None:
+            logger.warning("Trade events for %s overflowed past the trade history; trades after seq %d not streamed",
+                           self.symbol, seq)
+            return np.empty(0, dtype=matching_engine.trade_dtype)
+        return history
+
+    def _replay(self, outbox: Outbox, batch_ms: int | None, since_seq: int):
+        """Queue the trades after since_seq that the live stream won't carry."""
+        last = self.seq
+        pending = self.pending.get(batch_ms)
+        if pending:
+            last = pending[0]["seq"] - 1  # The window's next flush has the rest
+        if since_seq >= last:
+            return
+        missed = self.book.trades_after(since_seq)
+        if missed is not None:
+            trades = self._encode(missed[missed["seq"] <= last])
+            if outbox.put(*(self._batch_frame(trades[i:i + DRAIN_BATCH]) for i in range(0, len(trades), DRAIN_BATCH))):
+                return
+        # Either the history is gone or the replay alone would overfill the
+        # outbox; either way the client must rebuild from a snapshot
+        outbox.put(json.dumps({"gap": {"after_seq": since_seq, "seq": last}}))
+
+    def _publish(self, trades: list[dict]):
+        if not trades:
+            return
+        framings = set(self.batch_ms.values())
+        if None in framings:
+            self._fan_out_each(trades)
+        if 0 in framings:
+            self._fan_out(self._batch_frame(trades), 0)
+        for window in framings - {None, 0}:
+            pending = self.pending.setdefault(window, [])
+            if not pending:
+                self.flushes[window] = self.loop.call_later(window / 1000, self._flush, window)
+            pending.extend(trades)
+
+    def _flush(self, window: int):
+        self.flushes.pop(window, None)
+        trades = self.pending.pop(window, None)
+        if trades:
+            self._fan_out(self._batch_frame(trades), window)
+
+    @staticmethod
+    def _batch_frame(trades: list[dict]) -> str:
+        return json.dumps({"trades": trades})
+
+    def _encode(self, batch) -> list[dict]:
+        trades = []
+        for row in batch.tolist():
+            trade_id, _, seq, price, quantity, timestamp, maker_order_id, taker_order_id, side, _, _ = row
+            trades.append({
+                "trade_id": trade_id,
+                "seq": seq,
+                "symbol": self.symbol,
+                "price": price,
+                "quantity": quantity,
+                "timestamp": timestamp,
+                "maker_order_id": maker_order_id,
+                "taker_order_id": taker_order_id,
+                "aggressor_side": matching_engine.Side(side).name,
+            })
+        return trades
+
+    def _fan_out(self, frame: str, batch_ms: int | None):
+        for client, outbox in self._framing(batch_ms):
+            if not outbox.put(frame):
+                self._drop(client, outbox)
+
+    def _fan_out_each(self, trades: list[dict]):
+        frames = None
+        for client, outbox in self._framing(None):
+            # Judge the client on its backlog before this burst, so a fast
+            # client is not dropped for a sweep larger than its queue
+            if len(outbox) >= outbox.limit:
+                self._drop(client, outbox)
                 continue
-            loop.create_task(send_trade(client, trade_data))
+            if frames is None:
+                frames = [json.dumps({"trade": trade}) for trade in trades]
+            outbox.put(*frames, force=True)
+
+    def _framing(self, batch_ms: int | None) -> list[tuple[WebSocket, Outbox]]:
+        return [(client, outbox) for client, outbox in self.subscribers.items()
+                if self.batch_ms.get(client) == batch_ms]
+
+    def _drop(self, client: WebSocket, outbox: Outbox):
+        # Disconnect policy: a client this far behind is dropped rather
+        # than buffered without limit
+        logger.warning("Trade queue full for client %s; disconnecting", client.client)
+        self.subscribers.pop(client, None)
+        self.batch_ms.pop(client, None)
+        asyncio.create_task(outbox.disconnect(1013, "Trade queue overflow."))
+
 
-    async def send_trade(client: WebSocket, trade_data: dict):
-        try:
-            await client.send_json({"trade": trade_data})
-        except Exception as e:
-            logger.warning("Failed to send trade to client %s: %s", client.client, e)
-            clients.discard(client)
+# Symbol -> hub
+hubs: dict[str, TradeHub] = {}
 
-    # Assign the callback
-    book.trade_callback = on_trade
 
+def get_hub(symbol: str) -> TradeHub:
+    hub = hubs.get(symbol)
+    if hub is None:
+        hub = hubs[symbol] = TradeHub(symbol)
+    return hub
+
+
+@router.websocket("/trades")
+async def get_trade_data(websocket: WebSocket):
+    """Stream trades as they happen. With ?batch_ms=0 trades are batched
+    per event loop iteration, and with ?batch_ms=1..5 per window of that
+    many milliseconds, into {"trades": [...]} frames. ?since_seq=N first
+    replays the trades after seq N."""
+    batch_ms = websocket.query_params.get("batch_ms")
+    if batch_ms is not None:
+        if not batch_ms.isdigit() or int(batch_ms) > MAX_BATCH_MS:
+            await websocket.close(code=1008, reason="Invalid batch_ms.")
+            return
+        batch_ms = int(batch_ms)
+    since_seq = websocket.query_params.get("since_seq")
+    if since_seq is not None:
+        if not since_seq.isdigit():
+            await websocket.close(code=1008, reason="Invalid since_seq.")
+            return
+        since_seq = int(since_seq)
+
+    await websocket.accept()
+    hub = get_hub("BTC-USD")
+    hub.subscribe(websocket, batch_ms, since_seq)
+    logger.info("Client connected: %s", websocket.client)
+
+    # Trades are written by the hub through the client's outbox; this
+    # handler only waits for the client to go away
     try:
         while True:
-            await asyncio.sleep(0.05)  # Keep the WebSocket alive
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(message.get("code", 1000))
     except WebSocketDisconnect:
-        clients.discard(websocket)
         logger.info("Client disconnected: %s", websocket.client)
     except Exception as e:
-        clients.discard(websocket)
         logger.error("WebSocket error for client %s: %s", websocket.client, e)
+    finally:
+        hub.unsubscribe(websocket)
@@ -0,0 +1,81 @@
+import asyncio
+import logging
+from collections import deque
+from fastapi import WebSocket
+
+logger = logging.getLogger(__name__)
+
+CLOSE_TIMEOUT = 1.0  # Seconds to wait for a close handshake with a stuck client
+
+
+class Outbox:
+    """Outbound frames for one websocket, written by its own sender task.
+
+    Producers never await, so a slow client cannot hold up the others.
+    `put` queues frames and returns False once the outbox would hold more
+    than `limit` frames; what to do then (drop, resync, disconnect) is the
+    caller's policy, and force=True queues them past the limit anyway. With
+    conflate=True each put replaces whatever has not been sent yet, so only
+    the newest state is kept and the limit never hits.
+    str frames go out as text, bytes as binary.
+    """
+
+    def __init__(self, websocket: WebSocket, limit: int = 256, conflate: bool = False):
+        self.websocket = websocket
+        self.limit = limit
+        self.conflate = conflate
+        self.frames: deque[str | bytes] = deque()
+        self.ready = asyncio.Event()
+        self.closed = False
+        self.task = asyncio.create_task(self._drain())
+
+    def put(self, *frames: str | bytes, force: bool = False) -> bool:
+        if self.closed:
+            return True  # The connection is going away; nothing left to protect
+        if self.conflate:
+            self.frames.clear()
+        elif not force and len(self.frames) + len(frames) > self.limit:
+            return False
+        self.frames.extend(frames)
+        self.ready.set()
+        return True
+
+    def __len__(self) -> int:
+        """Frames queued but not yet sent."""
+        return len(self.frames)
+
+    def clear(self):
+        """Drop frames that have not been sent yet."""
+        self.frames.clear()
+
+    def close(self):
+        """Stop sending. Unsent frames are dropped."""
+        self.closed = True
+        self.frames.clear()
+        self.task.cancel()
+
+    async def disconnect(self, code: int = 1000, reason: str | None = None):
+        """Stop sending and close the websocket."""
+        self.close()
+        try:
+            await asyncio.wait_for(self.websocket.close(code=code, reason=reason), CLOSE_TIMEOUT)
+        except Exception:
+            pass
+
+    async def _drain(self):
+        try:
+            while True:
+                await self.ready.wait()
+                self.ready.clear()
+                while self.frames:
+                    frame = self.frames.popleft()
+                    if isinstance(frame, bytes):
+                        await self.websocket.send_bytes(frame)
+                    else:
+                        await self.websocket.send_text(frame)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning("Failed to send to client %s: %s", self.websocket.client, e)
+            self.closed = True
+            self.frames.clear()
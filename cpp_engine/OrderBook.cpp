@@ -3,326 +3,543 @@
 #include <chrono>
 #include <atomic>
 #include <functional>
+#include <stdexcept>
+#include <memory>
+#include <algorithm>
 
 
 static std::atomic<uint64_t> trade_id_counter{1}; // Atomic counter for trade IDs
 std::atomic<uint64_t> OrderBook::order_id_counter{1}; // Atomic counter for order IDs
 
-OrderBook::OrderBook(const std::string&sym):symbol(sym),bids([](const Order& a,const Order&b){
+OrderBook::OrderBook(const std::string&sym, double tick_size, double lot_size, size_t ladder_levels,
+                     size_t trade_history, size_t delta_history)
+    :symbol(sym),symbol_id(SymbolTable::intern(sym)),spec{tick_size, lot_size},bid_levels(ladder_levels),ask_levels(ladder_levels),
+     trades(trade_history),deltas(delta_history)
+{}
 
-    if(a.price==b.price){
-        return a.timestamp>b.timestamp; // Earlier timestamp has higher priority
-    }
-    return a.price<b.price; // Higher price has higher priority
 
+static Side parseSide(const std::string& side){
+    if(side == "BUY") return Side::BUY;
+    if(side == "SELL") return Side::SELL;
+    throw std::invalid_argument("Unknown order side: " + side);
+}
 
-}),asks([](const Order& a,const Order&b){
+static OrderType parseOrderType(const std::string& type){
+    if(type == "LIMIT") return OrderType::LIMIT;
+    if(type == "MARKET") return OrderType::MARKET;
+    if(type == "IOC") return OrderType::IOC;
+    if(type == "FOK") return OrderType::FOK;
+    throw std::invalid_argument("Unknown order type: " + type);
+}
 
-    if(a.price==b.price){
-        return a.timestamp>b.timestamp; // Earlier timestamp has higher priority
-    }
-    return a.price>b.price; // Lower price has higher priority
-})
-{}
+OrderResult OrderBook::addOrder(double price, double quantity, const std::string& side_str, const std::string& type_str){
+    return addOrder(price, quantity, parseSide(side_str), parseOrderType(type_str));
+}
 
+uint64_t OrderBook::addOrder(double price, double quantity, const std::string& side_str, const std::string& type_str,
+                             std::vector<Trade>& fills){
+    return addOrder(price, quantity, parseSide(side_str), parseOrderType(type_str), fills);
+}
 
-std::vector<Trade> OrderBook::addOrder(double price, double quantity, std::string side_str, std::string type_str){
-    std::lock_guard<std::mutex> lock(mtx);
+OrderResult OrderBook::addOrder(double price, double quantity, Side side, OrderType type){
+    OrderResult result;
+    result.order_id = addOrder(price, quantity, side, type, result.trades);
+    return result;
+}
 
-    std::vector<Trade> executed_trades;
-    Side side = (side_str == "BUY") ? Side::BUY : Side::SELL;
-    OrderType type = (type_str == "LIMIT") ? OrderType::LIMIT : OrderType::MARKET;
+uint64_t OrderBook::addOrder(double price, double quantity, Side side, OrderType type, std::vector<Trade>& fills){
+    Order order = makeOrder(0, side, type, price, quantity);
+    order.order_id = order_id_counter.fetch_add(1, std::memory_order_relaxed);
+    executeOrder(order, fills);
+    return order.order_id;
+}
 
-    Order order(order_id_counter.fetch_add(1, std::memory_order_relaxed), side, type, price, quantity);
+// Convert an order's decimal price and quantity to ticks and lots. Throws
+// std::invalid_argument if the quantity is under one lot or the price
+// (ignored for MARKET orders) is under one tick, or either is non-finite or
+// out of range.
+Order OrderBook::makeOrder(uint64_t order_id, Side side, OrderType type, double price, double quantity) const{
+    Price ticks = spec.toTicks(price, side);
+    Qty lots = spec.toLots(quantity);
+    if(type != OrderType::MARKET && ticks <= 0){
+        throw std::invalid_argument("Invalid price: " + std::to_string(price));
+    }
+    if(lots <= 0){
+        throw std::invalid_argument("Invalid quantity: " + std::to_string(quantity));
+    }
+    return Order(order_id, side, type, ticks, lots);
+}
 
+// Run a fully built order (price/quantity in ticks/lots) under the book lock,
+// dispatching on its type, then publish the resulting book state
+void OrderBook::executeOrder(Order& order, std::vector<Trade>& fills){
+    size_t first_fill = fills.size();
+    std::shared_ptr<const TradeBatchCallback> on_trades;
+    {
+        std::lock_guard<std::mutex> lock(mtx);
+
+        dispatchOrder(order, fills);
+        book_version.fetch_add(1, std::memory_order_release);
+        publishImage();
+        on_trades = trade_batch_callback;
+    }
+    deliverTrades(on_trades, fills.data() + first_fill, fills.size() - first_fill);
+    notifyChange(fills.size() - first_fill);
+}
+
+void OrderBook::addOrders(const double* prices, const double* quantities, const Side* sides, const OrderType* types,
+                          size_t count, uint64_t* order_ids, uint32_t* fill_counts, std::vector<Trade>& fills){
+    // Reject the whole batch before any of it reaches the book
+    for(size_t i = 0; i < count; ++i) makeOrder(0, sides[i], types[i], prices[i], quantities[i]);
+
+    // Reserve the whole ID range up front so the batch gets consecutive IDs
+    uint64_t first_id = order_id_counter.fetch_add(count, std::memory_order_relaxed);
+    size_t first_fill = fills.size();
+    std::shared_ptr<const TradeBatchCallback> on_trades;
+    {
+        std::lock_guard<std::mutex> lock(mtx);
+        for(size_t i = 0; i < count; ++i){
+            Order order = makeOrder(first_id + i, sides[i], types[i], prices[i], quantities[i]);
+            size_t before = fills.size();
+            dispatchOrder(order, fills);
+            order_ids[i] = order.order_id;
+            fill_counts[i] = static_cast<uint32_t>(fills.size() - before);
+        }
+        // Readers see the batch as a single change to the book
+        book_version.fetch_add(1, std::memory_order_release);
+        publishImage();
+        on_trades = trade_batch_callback;
+    }
+    deliverTrades(on_trades, fills.data() + first_fill, fills.size() - first_fill);
+    notifyChange(fills.size() - first_fill);
+}
+
+void OrderBook::dispatchOrder(Order& order, std::vector<Trade>& fills){
+    OrderType type = order.type;
     if(type == OrderType::MARKET){
-       executed_trades = marketOrder(order);
+       marketOrder(order, fills);
     }
     else if(type == OrderType::IOC){
-       executed_trades = iocOrder(order);
+       iocOrder(order, fills);
     }
     else if(type == OrderType::FOK){
-       executed_trades = fokOrder(order);
+       fokOrder(order, fills);
     }
     else {
-        // Limit order
-        if (order.side == Side::BUY) {
-            bids.push(order);
-            bid_levels[price] += quantity;
-        } else {
-            asks.push(order);
-            ask_levels[price] += quantity;
-        }
-        executed_trades = limitOrder(order);
-        
+        limitOrder(order, fills);
+    }
+}
 
-       for(const auto& trade: executed_trades){
-            updateLevel(Side::BUY, trade.price, -trade.quantity);
-            updateLevel(Side::SELL, trade.price, -trade.quantity);
-       }
+void OrderBook::setTradeCallback(std::function<void (const Trade&)> callback){
+    {
+        std::lock_guard<std::mutex> lock(mtx);
+        trade_callback.swap(callback);
     }
-      return executed_trades;
-     
+    // The previous callback is released here, outside the book lock
 }
 
+std::function<void (const Trade&)> OrderBook::getTradeCallback() const{
+    std::lock_guard<std::mutex> lock(mtx);
+    return trade_callback;
+}
 
+void OrderBook::setTradeBatchCallback(TradeBatchCallback callback){
+    std::shared_ptr<const TradeBatchCallback> replacement;
+    if(callback) replacement = std::make_shared<const TradeBatchCallback>(std::move(callback));
+    {
+        std::lock_guard<std::mutex> lock(mtx);
+        trade_batch_callback.swap(replacement);
+    }
+    // The previous callback is released here, outside the book lock. A call
+    // that picked it up before the swap may still be delivering to it.
+}
 
-//Matching engine
+void OrderBook::setChangeCallback(ChangeCallback callback){
+    std::shared_ptr<const ChangeCallback> replacement;
+    if(callback) replacement = std::make_shared<const ChangeCallback>(std::move(callback));
+    {
+        std::lock_guard<std::mutex> lock(mtx);
+        change_callback.swap(replacement);
+    }
+}
 
-std::vector<Trade> OrderBook::limitOrder(Order& order){
-    std::vector<Trade> newTrades;
-
-    while(!bids.empty() && !asks.empty()){
-        Order top_bid=bids.top();
-        Order top_ask=asks.top();
-
-
-        if(top_bid.price>=top_ask.price){
-            double trade_price= top_ask.price;
-            double trade_quantity= std::min(top_bid.quantity,top_ask.quantity);
-
-            Trade trade;
-            trade.trade_id = trade_id_counter.fetch_add(1, std::memory_order_relaxed);
-            trade.symbol = symbol;
-            trade.price = trade_price;
-            trade.quantity = trade_quantity;
-            trade.timestamp = std::chrono::duration_cast<std::chrono::microseconds>(
-                std::chrono::steady_clock::now().time_since_epoch()
-            ).count();
-            trade.maker_order_id = top_ask.order_id;
-            trade.taker_order_id = top_bid.order_id;
-            trade.aggressor_side = (order.side == Side::BUY) ? Side::BUY : Side::SELL;
-
-            if (order.side == Side::BUY) {
-                trade.maker_fee = calculateFee(Side::SELL, trade_quantity * trade_price);
-                trade.taker_fee = calculateFee(Side::BUY, trade_quantity * trade_price);
-            } else {
-                trade.maker_fee = calculateFee(Side::BUY, trade_quantity * trade_price);
-                trade.taker_fee = calculateFee(Side::SELL, trade_quantity * trade_price);
-            }
+void OrderBook::armChangeCallback(){
+    change_event.clear();
+    change_armed.store(true, std::memory_order_relaxed);
+    // Pairs with the fence in notifyChange: either that call sees the arm,
+    // or the caller's next getVersion() sees the mutation
+    std::atomic_thread_fence(std::memory_order_seq_cst);
+}
 
-            newTrades.push_back(trade);
-            trades.push_back(trade);
+// Wake whoever is waiting on the book: the trade event consumer if this call
+// produced fills, and the change callback/fd if armed. Called by the public
+// mutators after the book lock is released; costs two relaxed loads when
+// nobody is waiting.
+void OrderBook::notifyChange(size_t fill_count){
+    std::atomic_thread_fence(std::memory_order_seq_cst);
+    // The consumer only arms after enableTradeEvents returned, so a
+    // successful exchange also makes the fd pointer visible here
+    if(fill_count > 0 && trade_events_waiting.load(std::memory_order_relaxed)
+       && trade_events_waiting.exchange(false, std::memory_order_acq_rel)){
+        trade_events_fd->signal();
+    }
+    if(!change_armed.load(std::memory_order_relaxed)) return;
+    if(!change_armed.exchange(false, std::memory_order_acq_rel)) return;
+
+    change_event.signal();
+    std::shared_ptr<const ChangeCallback> on_change;
+    {
+        std::lock_guard<std::mutex> lock(mtx);
+        on_change = change_callback;
+    }
+    if(on_change) (*on_change)();
+}
 
+int OrderBook::enableTradeEvents(size_t capacity){
+    std::lock_guard<std::mutex> lock(mtx);
+    if(!trade_events){
+        trade_events = std::make_unique<SpscRing<Trade>>(capacity);
+        trade_events_fd = std::make_unique<EventFd>();
+    }
+    trade_events_enabled = true;
+    return trade_events_fd->fd();
+}
 
-            if(trade_callback){
-                trade_callback(trade);
-            }
+void OrderBook::disableTradeEvents(){
+    std::lock_guard<std::mutex> lock(mtx);
+    trade_events_enabled = false;
+    trade_events_waiting.store(false, std::memory_order_relaxed);
+}
+
+size_t OrderBook::drainTradeEvents(Trade* out, size_t max){
+    if(!trade_events) return 0;
+    // Clear before popping so a signal for trades pushed after this pop
+    // is not lost
+    trade_events_fd->clear();
+    return trade_events->pop(out, max);
+}
+
+bool OrderBook::armTradeEvents(){
+    if(!trade_events) return true;
+    trade_events_waiting.store(true, std::memory_order_relaxed);
+    // Pairs with the fence in notifyChange: either the producer sees the
+    // arm and signals, or this check sees its trades
+    std::atomic_thread_fence(std::memory_order_seq_cst);
+    return trade_events->empty();
+}
+
+uint64_t OrderBook::getTradeEventsDropped() const{
+    std::lock_guard<std::mutex> lock(mtx);
+    return trade_events ? trade_events->droppedCount() : 0;
+}
+
+// Hand one call's fills to the batch callback. Runs after the book lock has
+// been released, so the callback may re-enter the book.
+void OrderBook::deliverTrades(const std::shared_ptr<const TradeBatchCallback>& on_trades,
+                              const Trade* fills, size_t count){
+    if(on_trades && count > 0) (*on_trades)(fills, count);
+}
 
-            // Update remaining quantities
-            top_bid.quantity -= trade_quantity;
-            top_ask.quantity -= trade_quantity;
+bool OrderBook::cancelOrder(uint64_t order_id){
+    {
+        std::lock_guard<std::mutex> lock(mtx);
 
-            bids.pop();
-            asks.pop();
+        Order* order = order_index.find(order_id);
+        if(!order) return false;
 
-            if (top_bid.quantity > 0) bids.push(top_bid);
-            if (top_ask.quantity > 0) asks.push(top_ask);
-        } else {
-            break;
+        unlinkOrder(order);
+        order_pool.release(order);
+        book_version.fetch_add(1, std::memory_order_release);
+        publishImage();
+    }
+    notifyChange(0);
+    return true;
+}
+
+// Amend a resting order. Reducing quantity at the same price keeps the order's
+// place in the queue; any other change re-enters it as a new limit order with
+// the same ID, so it loses priority and may match immediately.
+// Returns std::nullopt if the order is no longer resting.
+std::optional<std::vector<Trade>> OrderBook::modifyOrder(uint64_t order_id, double new_quantity, double new_price){
+    std::optional<std::vector<Trade>> fills;
+    std::shared_ptr<const TradeBatchCallback> on_trades;
+    {
+        std::lock_guard<std::mutex> lock(mtx);
+        fills = amendOrder(order_id, new_quantity, new_price);
+        on_trades = trade_batch_callback;
+    }
+    if(fills){
+        deliverTrades(on_trades, fills->data(), fills->size());
+        notifyChange(fills->size());
+    }
+    return fills;
+}
+
+// modifyOrder with `mtx` held
+std::optional<std::vector<Trade>> OrderBook::amendOrder(uint64_t order_id, double new_quantity, double new_price){
+    Order* order = order_index.find(order_id);
+    if(!order) return std::nullopt;
+
+    Order amended = makeOrder(order_id, order->side, OrderType::LIMIT, new_price, new_quantity);
+    Price price = amended.price;
+    Qty quantity = amended.quantity;
+    if(price == order->price && quantity <= order->quantity){
+        touchLevel(order->side, order->price);
+        order->level->total_quantity -= order->quantity - quantity;
+        order->quantity = quantity;
+        if(order->quantity <= 0){
+            unlinkOrder(order);
+            order_pool.release(order);
         }
+        book_version.fetch_add(1, std::memory_order_release);
+        publishImage();
+        return std::vector<Trade>{};
     }
 
-    return newTrades;
+    Order replacement(order->order_id, order->side, OrderType::LIMIT, price, quantity);
+    unlinkOrder(order);
+    order_pool.release(order);
+
+    std::vector<Trade> fills;
+    limitOrder(replacement, fills);
+    book_version.fetch_add(1, std::memory_order_release);
+    publishImage();
+    return fills;
 }
 
 
-std::vector<Trade> OrderBook::marketOrder(Order& order){
-    std::vector<Trade> trades_executed;
-       if(order.side == Side::BUY){
-        while(order.quantity>0 && !asks.empty()){
-            Order top_ask = asks.top();
-            double trade_quantity = std::min(order.quantity, top_ask.quantity);
-            double trade_price = top_ask.price;
+// Retained trades newer than `trade_id`, oldest first. Trades that have
+// already been overwritten in the history ring are not returned.
+std::vector<Trade> OrderBook::getTradesSince(uint64_t trade_id){
+    std::lock_guard<std::mutex> lock(mtx);
 
+    std::vector<Trade> result;
+    trades.since(trade_id, result);
+    return result;
+}
 
-            Trade trade;
-            trade.trade_id = trade_id_counter.fetch_add(1, std::memory_order_relaxed);
-            trade.symbol = symbol;
-            trade.price = trade_price;
-            trade.quantity = trade_quantity;
-            trade.timestamp = std::chrono::duration_cast<std::chrono::microseconds>(
-                std::chrono::steady_clock::now().time_since_epoch()
-            ).count();
-            trade.maker_order_id = top_ask.order_id;
-            trade.taker_order_id = order.order_id;
-            trade.aggressor_side = Side::BUY;
+bool OrderBook::getTradesAfterSeq(uint64_t seq, std::vector<Trade>& out) const{
+    std::lock_guard<std::mutex> lock(mtx);
+    size_t before = out.size();
+    if(!trades.sinceSeq(seq, out)) return false;
+    // Also catches a history too small to hold anything
+    if(out.size() - before != (trade_seq > seq ? trade_seq - seq : 0)){
+        out.resize(before);
+        return false;
+    }
+    return true;
+}
 
-            trade.maker_fee = calculateFee(Side::SELL, trade_quantity * trade_price);
-            trade.taker_fee = calculateFee(Side::BUY, trade_quantity * trade_price);
+uint64_t OrderBook::getTradeSeq() const{
+    std::lock_guard<std::mutex> lock(mtx);
+    return trade_seq;
+}
 
-            trades.push_back(trade);
-            trades_executed.push_back(trade);
-            if(trade_callback){
-                trade_callback(trade);
-            }
-            order.quantity -= trade_quantity;
-            top_ask.quantity -= trade_quantity;
 
-            asks.pop();
-            if (top_ask.quantity > 0) asks.push(top_ask);
-            updateLevel(Side::SELL, trade_price, -trade_quantity);
-        }
-       }
-       else{
-        while(order.quantity>0 && !bids.empty()){
-            Order top_bid = bids.top();
-            double trade_quantity = std::min(order.quantity,top_bid.quantity);
-            double trade_price = top_bid.price;
+//Matching engine
 
+// Walk the opposite side from the best level outwards, filling `order` against
+// resting orders in FIFO sequence. When `price_limited` is set the walk stops at
+// the first level that no longer crosses the order's limit price.
+template <typename Levels>
+void OrderBook::matchAgainst(Order& order, Levels& levels, bool price_limited, std::vector<Trade>& out){
+    while(order.quantity > 0 && !levels.empty()){
+        PriceLevel& level = *levels.best();
 
-            Trade trade;
-            trade.trade_id = trade_id_counter.fetch_add(1, std::memory_order_relaxed);
-            trade.symbol = symbol;
-            trade.price = trade_price;
-            trade.quantity = trade_quantity;
-            trade.timestamp = std::chrono::duration_cast<std::chrono::microseconds>(
-                std::chrono::steady_clock::now().time_since_epoch()
-            ).count();
-            trade.maker_order_id = top_bid.order_id;
-            trade.taker_order_id = order.order_id;
-            trade.aggressor_side = Side::SELL;
+        // The level crosses unless the limit price itself ranks strictly ahead of it
+        if(price_limited && Levels::better(order.price, level.price)) break;
 
-            trade.maker_fee = calculateFee(Side::BUY, trade_quantity * trade_price);
-            trade.taker_fee = calculateFee(Side::SELL, trade_quantity * trade_price);
+        touched_levels.emplace_back(order.side == Side::BUY ? Side::SELL : Side::BUY, level.price);
+        image_dirty = true; // Fills always consume the best level
 
+        while(order.quantity > 0 && !level.empty()){
+            Order* maker = level.head;
+            Qty trade_quantity = std::min(order.quantity, maker->quantity);
 
+            Trade trade = makeTrade(*maker, order, trade_quantity);
+            out.push_back(trade);
+            trades.push(trade);
+            if(trade_events_enabled) trade_events->push(trade);
 
-            trades.push_back(trade);
-            trades_executed.push_back(trade);
             if(trade_callback){
                 trade_callback(trade);
             }
 
             order.quantity -= trade_quantity;
-            top_bid.quantity -= trade_quantity;
-            bids.pop();
-            if (top_bid.quantity > 0) bids.push(top_bid);
-            
-            updateLevel(Side::BUY, trade_price, -trade_quantity);
+            maker->quantity -= trade_quantity;
+            level.total_quantity -= trade_quantity;
+
+            if(maker->quantity <= 0){
+                level.remove(maker);
+                order_index.erase(maker->order_id);
+                order_pool.release(maker);
+            }
+        }
+
+        if(level.empty()){
+            levels.erase(&level);
         }
-       }
-       return trades_executed;
+    }
 }
 
-// Update order book levels
-void OrderBook::updateLevel(Side side, double price, double qtychange) {
-    if (side == Side::BUY) {
-        bid_levels[price] += qtychange;
-        if (bid_levels[price] <= 0)
-            bid_levels.erase(price);
+void OrderBook::restOrder(const Order& order){
+    touchLevel(order.side, order.price);
+    Order* node = order_pool.acquire(order);
+    if(order.side == Side::BUY){
+        bid_levels.levelAt(order.price).push_back(node);
     } else {
-        ask_levels[price] += qtychange;
-        if (ask_levels[price] <= 0)
-            ask_levels.erase(price);
+        ask_levels.levelAt(order.price).push_back(node);
     }
+    order_index.insert(node->order_id, node);
 }
 
-std::vector<Trade> OrderBook::iocOrder(Order& order) {
-    std::vector<Trade> trades_executed;
+// Detach a resting order from its level and the ID index without freeing it.
+// The level is dropped from its side once it becomes empty.
+void OrderBook::unlinkOrder(Order* order){
+    touchLevel(order->side, order->price);
+    PriceLevel* level = order->level;
+    level->remove(order);
+    if(level->empty()){
+        if(order->side == Side::BUY) bid_levels.erase(level);
+        else ask_levels.erase(level);
+    }
+    order_index.erase(order->order_id);
+}
 
-    if(order.side == Side::BUY) {
-        while(order.quantity > 0 && !asks.empty()) {
-            Order top_ask = asks.top();
-            if(top_ask.price > order.price) break; 
-
-            double trade_qty = std::min(order.quantity, top_ask.quantity);
-            double trade_price = top_ask.price;
-
-            Trade trade;
-            trade.trade_id = trade_id_counter.fetch_add(1, std::memory_order_relaxed);
-            trade.symbol = symbol;
-            trade.price = trade_price;
-            trade.quantity = trade_qty;
-            trade.timestamp = std::chrono::duration_cast<std::chrono::microseconds>(
-                std::chrono::steady_clock::now().time_since_epoch()
-            ).count();
-            trade.maker_order_id = top_ask.order_id;
-            trade.taker_order_id = order.order_id;
-            trade.aggressor_side = Side::BUY;
-
-            trades.push_back(trade);
-            trades_executed.push_back(trade);
-
-            order.quantity -= trade_qty;
-            top_ask.quantity -= trade_qty;
-
-            asks.pop();
-            if(top_ask.quantity > 0) asks.push(top_ask);
-
-            updateLevel(Side::SELL, trade_price, -trade_qty);
-        }
-    } else { // SELL
-        while(order.quantity > 0 && !bids.empty()) {
-            Order top_bid = bids.top();
-            if(top_bid.price < order.price) break; 
-
-            double trade_qty = std::min(order.quantity, top_bid.quantity);
-            double trade_price = top_bid.price;
-
-            Trade trade;
-            trade.trade_id = trade_id_counter.fetch_add(1, std::memory_order_relaxed);
-            trade.symbol = symbol;
-            trade.price = trade_price;
-            trade.quantity = trade_qty;
-            trade.timestamp = std::chrono::duration_cast<std::chrono::microseconds>(
-                std::chrono::steady_clock::now().time_since_epoch()
-            ).count();
-            trade.maker_order_id = top_bid.order_id;
-            trade.taker_order_id = order.order_id;
-            trade.aggressor_side = Side::SELL;
-
-            trades.push_back(trade);
-            trades_executed.push_back(trade);
-
-            order.quantity -= trade_qty;
-            top_bid.quantity -= trade_qty;
-
-            bids.pop();
-            if(top_bid.quantity > 0) bids.push(top_bid);
-
-            updateLevel(Side::BUY, trade_price, -trade_qty);
-        }
+// Record a change at `price` for the delta feed, and mark the published image
+// stale if the change can show up in it, i.e. the price is at or better than
+// the deepest published level
+void OrderBook::touchLevel(Side side, Price price){
+    touched_levels.emplace_back(side, price);
+    if(image_dirty) return;
+    if(side == Side::BUY){
+        image_dirty = staged.bid_count < kImageDepth || price >= staged.bids[staged.bid_count - 1].price;
+    } else {
+        image_dirty = staged.ask_count < kImageDepth || price <= staged.asks[staged.ask_count - 1].price;
+    }
+}
+
+// Rebuild the top-of-book image and hand it to readers, together with the
+// level deltas. Called by the public mutators with `mtx` held, so there is a
+// single writer.
+void OrderBook::publishImage(){
+    publishDeltas();
+    if(!image_dirty) return;
+    image_dirty = false;
+
+    staged.version = book_version.load(std::memory_order_relaxed);
+    staged.bid_count = 0;
+    bid_levels.forEach([&](const PriceLevel& level){
+        staged.bids[staged.bid_count++] = {level.price, level.total_quantity};
+        return staged.bid_count < kImageDepth;
+    });
+    staged.ask_count = 0;
+    ask_levels.forEach([&](const PriceLevel& level){
+        staged.asks[staged.ask_count++] = {level.price, level.total_quantity};
+        return staged.ask_count < kImageDepth;
+    });
+    published.publish(staged);
+}
+
+// One delta per level touched since the last publish, carrying its final
+// aggregate quantity (0 once the level is gone)
+void OrderBook::publishDeltas(){
+    if(touched_levels.empty()) return;
+    std::sort(touched_levels.begin(), touched_levels.end());
+    touched_levels.erase(std::unique(touched_levels.begin(), touched_levels.end()), touched_levels.end());
+    for(const auto& [side, price] : touched_levels){
+        const PriceLevel* level = side == Side::BUY ? bid_levels.find(price) : ask_levels.find(price);
+        deltas.push(side, spec.fromTicks(price), level ? spec.fromLots(level->total_quantity) : 0.0);
+    }
+    touched_levels.clear();
+}
+
+bool OrderBook::getDeltasSince(uint64_t seq, std::vector<LevelDelta>& out) const{
+    std::lock_guard<std::mutex> lock(mtx);
+    return deltas.since(seq, out);
+}
+
+Trade OrderBook::makeTrade(const Order& maker, const Order& taker, Qty quantity){
+    double price = spec.fromTicks(maker.price);
+    double qty = spec.fromLots(quantity);
+
+    Trade trade;
+    trade.trade_id = trade_id_counter.fetch_add(1, std::memory_order_relaxed);
+    trade.symbol_id = symbol_id;
+    trade.seq = ++trade_seq;
+    trade.price = price;
+    trade.quantity = qty;
+    trade.timestamp = std::chrono::duration_cast<std::chrono::microseconds>(
+        std::chrono::steady_clock::now().time_since_epoch()
+    ).count();
+    trade.maker_order_id = maker.order_id;
+    trade.taker_order_id = taker.order_id;
+    trade.aggressor_side = taker.side;
+    trade.maker_fee = calculateFee(true, qty * price);
+    trade.taker_fee = calculateFee(false, qty * price);
+    return trade;
+}
+
+void OrderBook::limitOrder(Order& order, std::vector<Trade>& fills){
+    if(order.side == Side::BUY){
+        matchAgainst(order, ask_levels, true, fills);
+    } else {
+        matchAgainst(order, bid_levels, true, fills);
+    }
+
+    // Any residual rests at the back of its price level
+    if(order.quantity > 0){
+        restOrder(order);
     }
+}
 
-    return trades_executed;
+
+void OrderBook::marketOrder(Order& order, std::vector<Trade>& fills){
+    if(order.side == Side::BUY){
+        matchAgainst(order, ask_levels, false, fills);
+    } else {
+        matchAgainst(order, bid_levels, false, fills);
+    }
 }
 
-std::vector<Trade> OrderBook::fokOrder(Order& order) {
-    std::vector<Trade> trades_executed;
+void OrderBook::iocOrder(Order& order, std::vector<Trade>& fills) {
+    if(order.side == Side::BUY){
+        matchAgainst(order, ask_levels, true, fills);
+    } else {
+        matchAgainst(order, bid_levels, true, fills);
+    }
+}
 
-   
-    double available_qty = 0.0;
+void OrderBook::fokOrder(Order& order, std::vector<Trade>& fills) {
+    Qty available_qty = 0;
 
     if(order.side == Side::BUY) {
-        for(auto& [price, qty] : ask_levels) {
-            if(price > order.price) break;
-            available_qty += qty;
-            if(available_qty >= order.quantity) break;
-        }
-        if(available_qty < order.quantity) return trades_executed; 
-        trades_executed = iocOrder(order); 
+        ask_levels.forEach([&](const PriceLevel& level) {
+            if(level.price > order.price) return false;
+            available_qty += level.total_quantity;
+            return available_qty < order.quantity;
+        });
+        if(available_qty < order.quantity) return;
+        iocOrder(order, fills);
     } else { // SELL
-        for(auto& [price, qty] : bid_levels) {
-            if(price < order.price) break;
-            available_qty += qty;
-            if(available_qty >= order.quantity) break;
-        }
-        if(available_qty < order.quantity) return trades_executed;
-        trades_executed = iocOrder(order); 
+        bid_levels.forEach([&](const PriceLevel& level) {
+            if(level.price < order.price) return false;
+            available_qty += level.total_quantity;
+            return available_qty < order.quantity;
+        });
+        if(available_qty < order.quantity) return;
+        iocOrder(order, fills);
     }
-
-    return trades_executed;
 }
 
 
 
 // helper function to calculate maker-taker fees
 
-double OrderBook::calculateFee(Side side, double amount) const {
-    if (side == Side::BUY) {
-        return amount * taker_fee_rate; // Assuming BUY orders are taker orders
+double OrderBook::calculateFee(bool is_maker, double amount) const {
+    if (is_maker) {
+        return amount * maker_fee_rate; // Resting order provided liquidity
     } else {
-        return amount * maker_fee_rate; // Assuming SELL orders are maker orders
+        return amount * taker_fee_rate; // Incoming order removed liquidity
     }
-}
\ No newline at end of file
+}
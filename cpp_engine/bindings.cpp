@@ -1,6 +1,9 @@
 #include <pybind11/pybind11.h>
 #include <pybind11/stl.h>
 #include <pybind11/functional.h>        
+#include <pybind11/numpy.h>
+#include <chrono>
+#include <algorithm>
 #include "include/order.hpp"
 #include "include/order_book.hpp"
 #include "include/trade.hpp"
@@ -8,6 +11,73 @@
 
 namespace py = pybind11;
 
+using DoubleArray = py::array_t<double, py::array::c_style | py::array::forcecast>;
+using CodeArray = py::array_t<uint8_t, py::array::c_style | py::array::forcecast>;
+
+// Hand a fill buffer to NumPy without copying; the array owns the vector
+static py::array_t<Trade> tradeArray(std::vector<Trade>&& trades){
+    auto* owned = new std::vector<Trade>(std::move(trades));
+    py::capsule release(owned, [](void* p){ delete static_cast<std::vector<Trade>*>(p); });
+    return py::array_t<Trade>(static_cast<py::ssize_t>(owned->size()), owned->data(), release);
+}
+
+// Share a Python callable with engine threads. Copies only touch the
+// shared_ptr, and the callable is dropped with the GIL held.
+static std::shared_ptr<py::function> sharedFunction(py::function callback){
+    return std::shared_ptr<py::function>(new py::function(std::move(callback)), [](py::function* f){
+        py::gil_scoped_acquire gil;
+        delete f;
+    });
+}
+
+// Adapt a Python callable to OrderBook::TradeBatchCallback. Each batch is
+// copied into a structured array (dtype trade_dtype) the callable may keep.
+static OrderBook::TradeBatchCallback tradeBatchCallback(py::function callback){
+    auto fn = sharedFunction(std::move(callback));
+    return [fn](const Trade* fills, size_t count){
+        py::gil_scoped_acquire gil;
+        (*fn)(py::array_t<Trade>(static_cast<py::ssize_t>(count), fills));
+    };
+}
+
+// (n, 2) float64 array of (price, quantity) rows
+static py::array_t<double> depthRows(const SymbolSpec& spec, const std::vector<DepthLevel>& levels){
+    py::array_t<double> out({static_cast<py::ssize_t>(levels.size()), py::ssize_t{2}});
+    auto view = out.mutable_unchecked<2>();
+    for(size_t i = 0; i < levels.size(); ++i){
+        view(i, 0) = spec.fromTicks(levels[i].price);
+        view(i, 1) = spec.fromLots(levels[i].quantity);
+    }
+    return out;
+}
+
+// Run a batch through OrderBook::addOrders with the GIL released. Side and
+// type codes are the underlying values of the Side/OrderType enums.
+// Returns (order_ids, fill_counts, fills) as NumPy arrays.
+static py::tuple addOrders(OrderBook& ob, DoubleArray prices, DoubleArray quantities, CodeArray sides, CodeArray types){
+    const size_t count = static_cast<size_t>(prices.size());
+    if(quantities.size() != prices.size() || sides.size() != prices.size() || types.size() != prices.size()){
+        throw py::value_error("add_orders: prices, quantities, sides and types must have the same length");
+    }
+    const uint8_t* side_codes = sides.data();
+    const uint8_t* type_codes = types.data();
+    for(size_t i = 0; i < count; ++i){
+        if(side_codes[i] > static_cast<uint8_t>(Side::SELL)) throw py::value_error("add_orders: invalid side code");
+        if(type_codes[i] > static_cast<uint8_t>(OrderType::FOK)) throw py::value_error("add_orders: invalid order type code");
+    }
+
+    py::array_t<uint64_t> order_ids(static_cast<py::ssize_t>(count));
+    py::array_t<uint32_t> fill_counts(static_cast<py::ssize_t>(count));
+    std::vector<Trade> fills;
+    {
+        py::gil_scoped_release release;
+        ob.addOrders(prices.data(), quantities.data(), reinterpret_cast<const Side*>(side_codes),
+                     reinterpret_cast<const OrderType*>(type_codes), count,
+                     order_ids.mutable_data(), fill_counts.mutable_data(), fills);
+    }
+    return py::make_tuple(order_ids, fill_counts, tradeArray(std::move(fills)));
+}
+
 PYBIND11_MODULE(matching_engine, m) {
     m.doc() = "C++ Matching Engine Module";
 
@@ -19,10 +89,16 @@ PYBIND11_MODULE(matching_engine, m) {
     py::enum_<OrderType>(m, "OrderType")
         .value("LIMIT", OrderType::LIMIT)
         .value("MARKET", OrderType::MARKET)
+        .value("IOC", OrderType::IOC)
+        .value("FOK", OrderType::FOK)
         .export_values();
 
+    PYBIND11_NUMPY_DTYPE(Trade, trade_id, symbol_id, seq, price, quantity, timestamp,
+                         maker_order_id, taker_order_id, aggressor_side, maker_fee, taker_fee);
+    PYBIND11_NUMPY_DTYPE(LevelDelta, seq, side, price, quantity);
+
     py::class_<Order>(m, "Order")
-        .def(py::init<uint64_t, Side, OrderType, double, double>())  // assuming price & quantity are double
+        .def(py::init<uint64_t, Side, OrderType, Price, Qty>())  // price & quantity in integer ticks/lots
         .def_readonly("order_id", &Order::order_id)
         .def_readonly("side", &Order::side)
         .def_readonly("type", &Order::type)
@@ -32,7 +108,9 @@ PYBIND11_MODULE(matching_engine, m) {
 
     py::class_<Trade>(m, "Trade")
         .def_readonly("trade_id", &Trade::trade_id)
-        .def_readonly("symbol", &Trade::symbol)
+        .def_readonly("symbol_id", &Trade::symbol_id)
+        .def_readonly("seq", &Trade::seq)
+        .def_property_readonly("symbol", [](const Trade& t){ return SymbolTable::name(t.symbol_id); })
         .def_readonly("price", &Trade::price)
         .def_readonly("quantity", &Trade::quantity)
         .def_readonly("timestamp", &Trade::timestamp)
@@ -40,16 +118,203 @@ PYBIND11_MODULE(matching_engine, m) {
         .def_readonly("taker_order_id", &Trade::taker_order_id)
         .def_readonly("aggressor_side", &Trade::aggressor_side);
 
-    py::class_<OrderBook>(m, "OrderBook")
-        .def(py::init<const std::string&>())
-        .def("add_order", &OrderBook::addOrder)
-        .def("limit_order", &OrderBook::limitOrder)
-        .def("market_order", &OrderBook::marketOrder)
-        .def_readwrite("trade_callback", &OrderBook::trade_callback)
-        .def("get_bbo", &OrderBook::getBBO)
-        .def("get_snapshot",[](OrderBook&ob, size_t depth){
-            nlohmann::json snap = ob.getSnapshot(depth);
-            return snap;
+    m.attr("trade_dtype") = py::dtype::of<Trade>();
+    m.attr("delta_dtype") = py::dtype::of<LevelDelta>();
+
+    // `trades` builds a list of Trade objects on every access; trade_count and
+    // trade_array read the fills without creating a Python object per fill
+    py::class_<OrderResult>(m, "OrderResult")
+        .def_readonly("order_id", &OrderResult::order_id)
+        .def_readonly("trades", &OrderResult::trades)
+        .def_property_readonly("trade_count", [](const OrderResult& r){ return r.trades.size(); })
+        .def_property_readonly("trade_array", [](py::object self){
+            const OrderResult& r = self.cast<const OrderResult&>();
+            // Read-only view over the result's own buffer, which it keeps alive
+            py::array_t<Trade> view(static_cast<py::ssize_t>(r.trades.size()), r.trades.data(), self);
+            view.attr("setflags")(py::arg("write") = false);
+            return view;
         });
+
+    py::class_<OrderBook>(m, "OrderBook")
+        .def(py::init<const std::string&, double, double, size_t, size_t, size_t>(),
+             py::arg("symbol"), py::arg("tick_size") = 0.01, py::arg("lot_size") = 1e-8,
+             py::arg("ladder_levels") = 0, py::arg("trade_history") = 100000, py::arg("delta_history") = 65536)
+        .def_property_readonly("tick_size", [](const OrderBook& ob){ return ob.getSpec().tick_size; })
+        .def_property_readonly("lot_size", [](const OrderBook& ob){ return ob.getSpec().lot_size; })
+        .def_property_readonly("allocation_count", &OrderBook::getAllocationCount)
+        // Engine calls drop the GIL before taking the book lock: a fill
+        // callback reacquires the GIL while that lock is held, so holding
+        // both in the opposite order would deadlock
+        // Typed overload first: Side/OrderType enums skip string parsing
+        .def("add_order", py::overload_cast<double, double, Side, OrderType>(&OrderBook::addOrder),
+             py::arg("price"), py::arg("quantity"), py::arg("side"), py::arg("type"),
+             py::call_guard<py::gil_scoped_release>())
+        .def("add_order", py::overload_cast<double, double, const std::string&, const std::string&>(&OrderBook::addOrder),
+             py::arg("price"), py::arg("quantity"), py::arg("side"), py::arg("type"),
+             py::call_guard<py::gil_scoped_release>())
+        .def("add_orders", &addOrders,
+             py::arg("prices"), py::arg("quantities"), py::arg("sides"), py::arg("types"))
+        // Structured array with price, quantity, side and type fields
+        .def("add_orders", [](OrderBook& ob, py::array orders){
+            auto field = [&](const char* name){ return py::object(orders[py::str(name)]); };
+            return addOrders(ob, DoubleArray(field("price")), DoubleArray(field("quantity")),
+                             CodeArray(field("side")), CodeArray(field("type")));
+        }, py::arg("orders"))
+        .def("cancel_order", &OrderBook::cancelOrder, py::call_guard<py::gil_scoped_release>())
+        .def("modify_order", &OrderBook::modifyOrder, py::call_guard<py::gil_scoped_release>())
+        .def("limit_order", [](OrderBook& ob, Order& order){
+            std::vector<Trade> fills;
+            order.type = OrderType::LIMIT;
+            ob.executeOrder(order, fills);
+            return fills;
+        }, py::call_guard<py::gil_scoped_release>())
+        .def("market_order", [](OrderBook& ob, Order& order){
+            std::vector<Trade> fills;
+            order.type = OrderType::MARKET;
+            ob.executeOrder(order, fills);
+            return fills;
+        }, py::call_guard<py::gil_scoped_release>())
+        .def("trades_since", &OrderBook::getTradesSince, py::arg("trade_id") = 0,
+             py::call_guard<py::gil_scoped_release>())
+        // Structured array (trade_dtype) of trades with seq > `seq`, or None
+        // if the retained history no longer reaches back that far
+        .def("trades_after", [](const OrderBook& ob, uint64_t seq) -> py::object {
+            std::vector<Trade> out;
+            bool complete;
+            {
+                py::gil_scoped_release release;
+                complete = ob.getTradesAfterSeq(seq, out);
+            }
+            if(!complete) return py::none();
+            return tradeArray(std::move(out));
+        }, py::arg("seq"))
+        .def_property_readonly("trade_seq", [](const OrderBook& ob){
+            py::gil_scoped_release release;
+            return ob.getTradeSeq();
+        })
+        .def_property("trade_callback",
+             [](const OrderBook& ob){
+                 py::gil_scoped_release release;
+                 return ob.getTradeCallback();
+             },
+             [](OrderBook& ob, std::function<void (const Trade&)> callback){
+                 py::gil_scoped_release release;
+                 ob.setTradeCallback(std::move(callback));
+             })
+        // Batched alternative to trade_callback: called once per add/modify
+        // with a structured array of that call's fills, after the book lock
+        // is released. Pass None to disable.
+        .def("set_trade_batch_callback", [](OrderBook& ob, std::optional<py::function> callback){
+            OrderBook::TradeBatchCallback adapted;
+            if(callback) adapted = tradeBatchCallback(std::move(*callback));
+            py::gil_scoped_release release;
+            ob.setTradeBatchCallback(std::move(adapted));
+        }, py::arg("callback"))
+        // fn() is called once, from the mutating thread, after the next
+        // change that follows arm_change_callback(). Pass None to disable.
+        .def("set_change_callback", [](OrderBook& ob, std::optional<py::function> callback){
+            OrderBook::ChangeCallback adapted;
+            if(callback){
+                adapted = [fn = sharedFunction(std::move(*callback))](){
+                    py::gil_scoped_acquire gil;
+                    (*fn)();
+                };
+            }
+            py::gil_scoped_release release;
+            ob.setChangeCallback(std::move(adapted));
+        }, py::arg("callback"))
+        .def("arm_change_callback", &OrderBook::armChangeCallback)
+        // Readable after each armed change; suitable for loop.add_reader
+        .def_property_readonly("change_fd", &OrderBook::getChangeEventFd)
+        // Trade events without calling into Python from the engine: fills go
+        // into a ring drained by drain_trade_events(), and the returned fd
+        // becomes readable when arm_trade_events() returned True and a trade
+        // has arrived since.
+        .def("enable_trade_events", &OrderBook::enableTradeEvents, py::arg("capacity") = 65536,
+             py::call_guard<py::gil_scoped_release>())
+        .def("disable_trade_events", &OrderBook::disableTradeEvents, py::call_guard<py::gil_scoped_release>())
+        // Structured array (trade_dtype) of up to `max` queued trades, oldest first
+        .def("drain_trade_events", [](OrderBook& ob, size_t max){
+            // Sized from what is queued, so an idle wakeup allocates nothing
+            // big. Only this consumer pops, so all `count` are still there.
+            size_t count = std::min(max, ob.pendingTradeEvents());
+            py::array_t<Trade> out(static_cast<py::ssize_t>(count));
+            Trade* data = out.mutable_data();
+            {
+                py::gil_scoped_release release;
+                ob.drainTradeEvents(data, count);
+            }
+            return out;
+        }, py::arg("max") = 4096)
+        .def("arm_trade_events", &OrderBook::armTradeEvents)
+        .def_property_readonly("trade_events_dropped", [](const OrderBook& ob){
+            py::gil_scoped_release release;
+            return ob.getTradeEventsDropped();
+        })
+        .def("get_bbo", &OrderBook::getBBO, py::call_guard<py::gil_scoped_release>())
+        .def_property_readonly("version", &OrderBook::getVersion)
+        .def_property_readonly("top_version", &OrderBook::getTopVersion)
+        // Structured array (delta_dtype) of level deltas after `seq`, or None
+        // if the history no longer reaches back that far
+        .def("deltas_since", [](const OrderBook& ob, uint64_t seq) -> py::object {
+            std::vector<LevelDelta> out;
+            bool complete;
+            {
+                py::gil_scoped_release release;
+                complete = ob.getDeltasSince(seq, out);
+            }
+            if(!complete) return py::none();
+            return py::array_t<LevelDelta>(static_cast<py::ssize_t>(out.size()), out.data());
+        }, py::arg("seq"))
+        // (seq, bids, asks): the top `depth` levels (0 = all) as (n, 2) float64
+        // (price, quantity) arrays, consistent with delta `seq`
+        .def("get_levels", [](const OrderBook& ob, size_t depth){
+            std::vector<DepthLevel> bids, asks;
+            uint64_t seq;
+            {
+                py::gil_scoped_release release;
+                seq = ob.getLevels(depth, bids, asks);
+            }
+            return py::make_tuple(seq, depthRows(ob.getSpec(), bids), depthRows(ob.getSpec(), asks));
+        }, py::arg("depth") = 0)
+        // (bids, asks, version, timestamp_us): bids and asks are (n, 2) float64
+        // arrays of (price, quantity) rows, best first, with n <= depth
+        .def("get_depth", [](const OrderBook& ob, size_t depth){
+            std::vector<DepthLevel> bids, asks;
+            uint64_t version;
+            int64_t timestamp;
+            {
+                py::gil_scoped_release release;
+                version = ob.getDepth(depth, bids, asks);
+                timestamp = std::chrono::duration_cast<std::chrono::microseconds>(
+                    std::chrono::system_clock::now().time_since_epoch()).count();
+            }
+            return py::make_tuple(depthRows(ob.getSpec(), bids), depthRows(ob.getSpec(), asks), version, timestamp);
+        }, py::arg("depth"))
+        // Serialized snapshot as bytes: format is "json" (compact JSON text)
+        // or "binary" (see SnapshotFormat in order_book.hpp)
+        .def("get_snapshot_bytes", [](const OrderBook& ob, size_t depth, const std::string& format){
+            SnapshotFormat wire;
+            if(format == "json") wire = SnapshotFormat::JSON;
+            else if(format == "binary") wire = SnapshotFormat::BINARY;
+            else throw py::value_error("get_snapshot_bytes: format must be 'json' or 'binary'");
+
+            std::shared_ptr<const SnapshotBytes> payload;
+            {
+                py::gil_scoped_release release;
+                payload = ob.getSnapshotBytes(depth, wire);
+            }
+            return py::bytes(payload->data);
+        }, py::arg("depth"), py::arg("format") = "json")
+        // A fresh dict per call; the C++ side caches the rendered snapshot
+        // per depth while the book is unchanged
+        .def("get_snapshot",[](const OrderBook& ob, size_t depth){
+            std::shared_ptr<const BookSnapshot> snap;
+            {
+                py::gil_scoped_release release;
+                snap = ob.getSnapshot(depth);
+            }
+            return py::cast(snap->json);
+        }, py::arg("depth"));
         
 }
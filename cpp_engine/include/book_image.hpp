@@ -0,0 +1,67 @@
+#pragma once
+
+#include "order.hpp"
+#include <atomic>
+#include <cstdint>
+#include <cstddef>
+#include <cstring>
+#include <type_traits>
+
+// Number of levels per side kept in the published top-of-book image
+constexpr size_t kImageDepth = 16;
+
+struct DepthLevel {
+    Price price;
+    Qty quantity;
+};
+
+// Top-N levels of both sides, best first, in ticks/lots. `version` is the
+// book version at which this view was last changed.
+struct DepthImage {
+    uint64_t version = 0;
+    uint64_t bid_count = 0;
+    uint64_t ask_count = 0;
+    DepthLevel bids[kImageDepth] = {};
+    DepthLevel asks[kImageDepth] = {};
+};
+
+// Seqlock around a DepthImage. The matching thread publishes a fresh image
+// after each mutation that touches the top of the book; any number of readers
+// take consistent copies without blocking it. The payload is held as relaxed
+// atomic words so concurrent reads are well defined.
+class PublishedImage {
+    public:
+        // Single writer only
+        void publish(const DepthImage& image) {
+            uint64_t raw[kWords];
+            std::memcpy(raw, &image, sizeof(DepthImage));
+
+            uint64_t seq = sequence.load(std::memory_order_relaxed);
+            sequence.store(seq + 1, std::memory_order_relaxed);
+            std::atomic_thread_fence(std::memory_order_release);
+            for (size_t i = 0; i < kWords; ++i) words[i].store(raw[i], std::memory_order_relaxed);
+            sequence.store(seq + 2, std::memory_order_release);
+        }
+
+        DepthImage read() const {
+            uint64_t raw[kWords];
+            while (true) {
+                uint64_t before = sequence.load(std::memory_order_acquire);
+                if (before & 1) continue; // Write in progress
+                for (size_t i = 0; i < kWords; ++i) raw[i] = words[i].load(std::memory_order_relaxed);
+                std::atomic_thread_fence(std::memory_order_acquire);
+                if (sequence.load(std::memory_order_relaxed) == before) break;
+            }
+            DepthImage image;
+            std::memcpy(&image, raw, sizeof(DepthImage));
+            return image;
+        }
+
+    private:
+        static_assert(std::is_trivially_copyable<DepthImage>::value, "DepthImage must be trivially copyable");
+        static_assert(sizeof(DepthImage) % sizeof(uint64_t) == 0, "DepthImage must be a whole number of words");
+        static constexpr size_t kWords = sizeof(DepthImage) / sizeof(uint64_t);
+
+        std::atomic<uint64_t> sequence{0};
+        std::atomic<uint64_t> words[kWords] = {};
+};
@@ -0,0 +1,57 @@
+#pragma once
+
+#include <system_error>
+#include <cerrno>
+#include <cstdint>
+#include <unistd.h>
+#include <fcntl.h>
+#ifdef __linux__
+#include <sys/eventfd.h>
+#endif
+
+// Wakeup handle that an event loop can watch for readability (e.g. asyncio's
+// loop.add_reader). Uses an eventfd on Linux and a non-blocking pipe
+// elsewhere. signal() never blocks; clear() consumes pending signals.
+class EventFd {
+    public:
+        EventFd() {
+#ifdef __linux__
+            read_fd = write_fd = ::eventfd(0, EFD_NONBLOCK | EFD_CLOEXEC);
+            if (read_fd < 0) throw std::system_error(errno, std::generic_category(), "eventfd");
+#else
+            int fds[2];
+            if (::pipe(fds) < 0) throw std::system_error(errno, std::generic_category(), "pipe");
+            for (int fd : fds) {
+                ::fcntl(fd, F_SETFL, ::fcntl(fd, F_GETFL) | O_NONBLOCK);
+                ::fcntl(fd, F_SETFD, FD_CLOEXEC);
+            }
+            read_fd = fds[0];
+            write_fd = fds[1];
+#endif
+        }
+
+        ~EventFd() {
+            ::close(read_fd);
+            if (write_fd != read_fd) ::close(write_fd);
+        }
+
+        EventFd(const EventFd&) = delete;
+        EventFd& operator=(const EventFd&) = delete;
+
+        int fd() const { return read_fd; }
+
+        void signal() {
+            uint64_t one = 1;
+            // A full counter/pipe already means "readable", so failure is fine
+            [[maybe_unused]] ssize_t n = ::write(write_fd, &one, write_fd == read_fd ? sizeof(one) : 1);
+        }
+
+        void clear() {
+            uint64_t buf[8];
+            while (::read(read_fd, buf, sizeof(buf)) > 0 && write_fd != read_fd) {}
+        }
+
+    private:
+        int read_fd;
+        int write_fd;
+};
@@ -0,0 +1,45 @@
+#pragma once
+
+#include "order.hpp"
+#include <vector>
+#include <cstdint>
+#include <cstddef>
+
+// New aggregate quantity at one price level; quantity 0 means the level is
+// gone. Sequence numbers are consecutive per book, starting at 1.
+struct LevelDelta {
+    uint64_t seq;
+    Side side;
+    double price;    // Decimal units
+    double quantity;
+};
+
+// Fixed-capacity history of level deltas, indexed directly by sequence
+// number. When full, each new delta overwrites the oldest one.
+class DeltaRing {
+    public:
+        explicit DeltaRing(size_t capacity) : buffer(capacity) {}
+
+        void push(Side side, double price, double quantity) {
+            uint64_t seq = ++last;
+            if (buffer.empty()) return;
+            buffer[seq % buffer.size()] = {seq, side, price, quantity};
+        }
+
+        // Sequence number of the newest delta, 0 before the first one
+        uint64_t lastSeq() const { return last; }
+
+        // Append every delta after `seq`, oldest first. Returns false, and
+        // appends nothing, if some of them have already been overwritten.
+        bool since(uint64_t seq, std::vector<LevelDelta>& out) const {
+            if (seq >= last) return true;
+            if (last - seq > buffer.size()) return false;
+            out.reserve(out.size() + (last - seq));
+            for (uint64_t s = seq + 1; s <= last; ++s) out.push_back(buffer[s % buffer.size()]);
+            return true;
+        }
+
+    private:
+        std::vector<LevelDelta> buffer;
+        uint64_t last = 0;
+};
@@ -2,11 +2,14 @@
 
 #include <string>
 #include <chrono>
+#include <cstdint>
 
-enum class Side { BUY,SELL};
-enum class OrderType { LIMIT, MARKET,IOC,FOK};
-using Price  = double;
-using Qty    = double;
+struct PriceLevel;
+
+enum class Side : uint8_t { BUY,SELL};
+enum class OrderType : uint8_t { LIMIT, MARKET,IOC,FOK};
+using Price  = int64_t; // Integer ticks, see SymbolSpec
+using Qty    = int64_t; // Integer lots, see SymbolSpec
 using Timestamp = uint64_t;
 
 struct Order {
@@ -17,6 +20,11 @@ struct Order {
     Qty quantity;
     Timestamp timestamp;
 
+    // Intrusive links into the owning PriceLevel's FIFO queue
+    Order* prev = nullptr;
+    Order* next = nullptr;
+    PriceLevel* level = nullptr;
+
     Order(uint64_t id, Side s, OrderType t, Price p, Qty q)
         : order_id(id), side(s), type(t), price(p), quantity(q), timestamp(std::chrono::duration_cast<std::chrono::microseconds>(
             std::chrono::steady_clock::now().time_since_epoch()
@@ -2,43 +2,219 @@
 
 #include "order.hpp"
 #include "trade.hpp"
-#include <queue>
+#include "price_ladder.hpp"
+#include "symbol_spec.hpp"
+#include "symbol_table.hpp"
+#include "order_pool.hpp"
+#include "order_index.hpp"
+#include "trade_ring.hpp"
+#include "book_image.hpp"
+#include "level_delta.hpp"
+#include "spsc_ring.hpp"
+#include "event_fd.hpp"
 #include <nlohmann/json.hpp>
-#include <map>
+#include <optional>
+#include <memory>
+#include <unordered_map>
 #include <vector>
 #include <string>
 #include <mutex>
+#include <atomic>
 #include <functional>
 
 
 
+// Result of submitting an order: the id assigned by the book (used to cancel
+// or modify it later) and the fills it produced.
+struct OrderResult {
+    uint64_t order_id;
+    std::vector<Trade> trades;
+};
+
+// A rendered market data snapshot and the book version it reflects
+struct BookSnapshot {
+    uint64_t version;
+    nlohmann::json json;
+};
+
+// Wire formats for getSnapshotBytes.
+//
+// JSON is the compact dump of getSnapshot(depth).
+//
+// BINARY is a little-endian header followed by (price, quantity) float64
+// pairs, bids then asks, each best first:
+//   uint8  layout version (1), 3 bytes padding
+//   uint32 symbol id (SymbolTable)
+//   uint64 book version
+//   int64  timestamp, microseconds since the Unix epoch
+//   uint32 bid count, uint32 ask count
+enum class SnapshotFormat : uint8_t { JSON, BINARY };
+
+// A serialized snapshot payload and the book version it reflects
+struct SnapshotBytes {
+    uint64_t version;
+    std::string data;
+};
 
 class OrderBook{
+    public:
+        // Receives all fills produced by one call into the book
+        using TradeBatchCallback = std::function<void (const Trade* fills, size_t count)>;
+        // Signals that the book changed; see armChangeCallback
+        using ChangeCallback = std::function<void ()>;
+
     private:
+        using BidLevels = PriceLadder<std::greater<Price>>;
+        using AskLevels = PriceLadder<std::less<Price>>;
+
         std::string symbol;
-        std::priority_queue<Order,std::vector<Order>,std::function<bool(const Order&,const Order&)>> bids;
-        std::priority_queue<Order,std::vector<Order>,std::function<bool(const Order&,const Order&)>> asks;
-        std::map<double,double, std::greater<double>> bid_levels; // Price -> Quantity
-        std::map<double,double,std::less<double>> ask_levels; // Price -> Quantity
-        std::vector<Trade> trades;
-        std::mutex mtx;
+        uint32_t symbol_id;
+        SymbolSpec spec;
+        BidLevels bid_levels; // Price -> FIFO queue of resting buy orders
+        AskLevels ask_levels; // Price -> FIFO queue of resting sell orders
+        OrderPool order_pool;   // Storage for resting orders
+        OrderIndex order_index; // Order ID -> resting order
+        TradeRing trades;       // Bounded recent trade history
+        DeltaRing deltas;       // Bounded level-change history
+        std::vector<std::pair<Side, Price>> touched_levels; // Levels changed since the last publish
+        mutable std::mutex mtx;
+        PublishedImage published; // Lock-free top-of-book for readers
+        DepthImage staged;        // Writer's copy of the last published image
+        bool image_dirty = false;
+        std::function<void (const Trade&)> trade_callback; // Invoked per fill with `mtx` held
+        std::shared_ptr<const TradeBatchCallback> trade_batch_callback; // Invoked per call after `mtx` is released
+        std::shared_ptr<const ChangeCallback> change_callback;
+        std::atomic<bool> change_armed{false};
+        EventFd change_event; // Signalled alongside the change callback
+        // Trade event stream; the ring and its fd live as long as the book
+        // once enabled, so the wakeup path can use them without the lock
+        std::unique_ptr<SpscRing<Trade>> trade_events;
+        std::unique_ptr<EventFd> trade_events_fd;
+        bool trade_events_enabled = false; // Guarded by `mtx`
+        std::atomic<bool> trade_events_waiting{false};
+        std::atomic<uint64_t> book_version{0}; // Bumped on every mutation
+        uint64_t trade_seq = 0; // Sequence number of the last trade; guarded by `mtx`
+
+        // Last rendered snapshot per depth, shared by concurrent readers
+        mutable std::mutex snapshot_mtx;
+        mutable std::unordered_map<size_t, std::shared_ptr<const BookSnapshot>> snapshot_cache;
+        // Serialized payloads keyed by depth and format
+        mutable std::unordered_map<size_t, std::shared_ptr<const SnapshotBytes>> snapshot_bytes_cache;
         static std::atomic<uint64_t> order_id_counter;
         double maker_fee_rate = 0.001; 
         double taker_fee_rate = 0.002; 
+
+        template <typename Levels>
+        void matchAgainst(Order& order, Levels& levels, bool price_limited, std::vector<Trade>& out);
+        void dispatchOrder(Order& order, std::vector<Trade>& fills);
+        Order makeOrder(uint64_t order_id, Side side, OrderType type, double price, double quantity) const;
+        std::optional<std::vector<Trade>> amendOrder(uint64_t order_id, double quantity, double price);
+        void notifyChange(size_t fill_count);
+        static void deliverTrades(const std::shared_ptr<const TradeBatchCallback>& on_trades,
+                                  const Trade* fills, size_t count);
+        void restOrder(const Order& order);
+        void unlinkOrder(Order* order);
+        Trade makeTrade(const Order& maker, const Order& taker, Qty quantity);
+        void touchLevel(Side side, Price price);
+        void publishImage();
+        void publishDeltas();
+        template <typename Visit>
+        uint64_t visitDepth(size_t depth, Visit&& visit) const;
         
 
 
     public:
-        OrderBook(const std::string& symbol);
-        std::vector<Trade> addOrder(double price, double quantity, std::string side, std::string type);
-        std::vector<Trade> limitOrder(Order& order);
-        std::vector<Trade> marketOrder(Order& order);
-        std::vector<Trade> iocOrder(Order& order);
-        std::vector<Trade> fokOrder(Order& order);
-        void updateLevel(Side side,double price,double quantity);
+        // ladder_levels > 0 keeps that many ticks around the touch in a dense
+        // array per side; 0 keeps every level in an ordered tree.
+        // trade_history and delta_history bound how many recent trades and
+        // level deltas are retained.
+        OrderBook(const std::string& symbol, double tick_size = 0.01, double lot_size = 1e-8,
+                  size_t ladder_levels = 0, size_t trade_history = 100000, size_t delta_history = 65536);
+        OrderBook(const OrderBook&) = delete;
+        OrderBook& operator=(const OrderBook&) = delete;
+
+        // Side is "BUY"/"SELL" and type "LIMIT"/"MARKET"/"IOC"/"FOK";
+        // anything else throws std::invalid_argument. Limit prices off the
+        // tick round toward the passive side (buys down, sells up); a price
+        // under one tick or a quantity under one lot, non-finite or out of
+        // range, also throws std::invalid_argument. MARKET ignores price.
+        OrderResult addOrder(double price, double quantity, const std::string& side, const std::string& type);
+        uint64_t addOrder(double price, double quantity, const std::string& side, const std::string& type,
+                          std::vector<Trade>& fills);
+        OrderResult addOrder(double price, double quantity, Side side, OrderType type);
+        // Appends fills to a caller-owned buffer that can be reused across calls;
+        // returns the assigned order ID
+        uint64_t addOrder(double price, double quantity, Side side, OrderType type, std::vector<Trade>& fills);
+        void executeOrder(Order& order, std::vector<Trade>& fills);
+        // Submits `count` orders under a single lock acquisition. Each order's
+        // ID goes to order_ids[i] and its fill count to fill_counts[i]; the
+        // fills themselves are appended to `fills` in submission order. If any
+        // order is invalid the whole batch is rejected, as with addOrder.
+        void addOrders(const double* prices, const double* quantities, const Side* sides, const OrderType* types,
+                       size_t count, uint64_t* order_ids, uint32_t* fill_counts, std::vector<Trade>& fills);
+        bool cancelOrder(uint64_t order_id);
+        // Prices and quantities are converted as in addOrder, by the order's side
+        std::optional<std::vector<Trade>> modifyOrder(uint64_t order_id, double quantity, double price);
+        void limitOrder(Order& order, std::vector<Trade>& fills);
+        void marketOrder(Order& order, std::vector<Trade>& fills);
+        void iocOrder(Order& order, std::vector<Trade>& fills);
+        void fokOrder(Order& order, std::vector<Trade>& fills);
         std::pair<std::pair<double, double>, std::pair<double, double>> getBBO() const;
-        nlohmann::json getSnapshot(size_t depth) const;
-        std::function<void (const Trade&)> trade_callback;
-        double calculateFee(Side side, double amount) const;
+        // Returns the cached snapshot for `depth` while the book is unchanged
+        std::shared_ptr<const BookSnapshot> getSnapshot(size_t depth) const;
+        // Ready-to-send snapshot payload, cached like getSnapshot
+        std::shared_ptr<const SnapshotBytes> getSnapshotBytes(size_t depth, SnapshotFormat format) const;
+        // Appends up to `depth` levels per side, best first, and returns the
+        // version they reflect (the top version for depth <= kImageDepth,
+        // including 0, which reads no levels)
+        uint64_t getDepth(size_t depth, std::vector<DepthLevel>& bids, std::vector<DepthLevel>& asks) const;
+        uint64_t getVersion() const { return book_version.load(std::memory_order_acquire); }
+        // Version at which the published top of book (kImageDepth levels) last changed
+        uint64_t getTopVersion() const { return published.read().version; }
+        std::vector<Trade> getTradesSince(uint64_t trade_id);
+        // Trades with sequence numbers after `seq`, oldest first. Returns
+        // false if the retained history no longer reaches back to seq + 1.
+        bool getTradesAfterSeq(uint64_t seq, std::vector<Trade>& out) const;
+        // Sequence number of the last trade (0 before the first)
+        uint64_t getTradeSeq() const;
+        // Level deltas after `seq`, oldest first. Returns false if some were
+        // already overwritten; the caller must then resync from getLevels.
+        bool getDeltasSince(uint64_t seq, std::vector<LevelDelta>& out) const;
+        // Top `depth` levels per side (0 = all), best first, with the sequence
+        // number of the last delta they include
+        uint64_t getLevels(size_t depth, std::vector<DepthLevel>& bids, std::vector<DepthLevel>& asks) const;
+        void setTradeCallback(std::function<void (const Trade&)> callback);
+        std::function<void (const Trade&)> getTradeCallback() const;
+        // Called once per add/modify with that call's fills (if any), outside
+        // the book lock. Batches from concurrent callers may arrive out of
+        // trade_id order. An empty callback disables delivery.
+        void setTradeBatchCallback(TradeBatchCallback callback);
+        // The change callback fires at most once per arming: after the next
+        // mutation that completes once armChangeCallback() has been called,
+        // outside the book lock. To wait without missing a change, arm first
+        // and then compare getVersion() against the last version seen.
+        void setChangeCallback(ChangeCallback callback);
+        void armChangeCallback();
+        // Readable after an armed change; armChangeCallback() clears it
+        int getChangeEventFd() const { return change_event.fd(); }
+        // Trade events: every fill is copied, with `mtx` held, into a
+        // preallocated single-consumer ring that never blocks the matcher
+        // (fills that find it full are dropped and counted). Returns an fd
+        // that becomes readable when trades arrive while the consumer waits.
+        // capacity applies to the first call only.
+        int enableTradeEvents(size_t capacity);
+        void disableTradeEvents();
+        // Consumer side (one thread at a time). Drain until it returns 0,
+        // then armTradeEvents(): true means the ring is empty and the fd
+        // will be signalled for the next trade; false means drain again.
+        size_t drainTradeEvents(Trade* out, size_t max);
+        // Trades drainTradeEvents would return now; consumer side only
+        size_t pendingTradeEvents() const { return trade_events ? trade_events->size() : 0; }
+        bool armTradeEvents();
+        uint64_t getTradeEventsDropped() const;
+        double calculateFee(bool is_maker, double amount) const;
+        const SymbolSpec& getSpec() const { return spec; }
+        // Heap allocations made by the book's order pool and ID index
+        size_t getAllocationCount() const { return order_pool.allocations() + order_index.allocations(); }
         
 };
@@ -0,0 +1,101 @@
+#pragma once
+
+#include "order.hpp"
+#include <vector>
+#include <cstdint>
+#include <cstddef>
+
+// Open-addressing order ID -> resting Order* map using linear probing with
+// backward-shift deletion (no tombstones). The table only grows when the
+// number of resting orders reaches a new high-water mark, so steady-state
+// inserts and erases never allocate.
+class OrderIndex {
+    public:
+        explicit OrderIndex(size_t initial_capacity = 1024) {
+            size_t capacity = 16;
+            while (capacity < initial_capacity) capacity <<= 1;
+            resize(capacity);
+        }
+
+        Order* find(uint64_t order_id) const {
+            for (size_t i = slotFor(order_id);; i = (i + 1) & mask) {
+                const Entry& entry = entries[i];
+                if (!entry.order) return nullptr;
+                if (entry.order_id == order_id) return entry.order;
+            }
+        }
+
+        void insert(uint64_t order_id, Order* order) {
+            if ((count + 1) * 2 > entries.size()) resize(entries.size() * 2);
+            for (size_t i = slotFor(order_id);; i = (i + 1) & mask) {
+                Entry& entry = entries[i];
+                if (!entry.order) {
+                    entry = {order_id, order};
+                    ++count;
+                    return;
+                }
+                if (entry.order_id == order_id) {
+                    entry.order = order;
+                    return;
+                }
+            }
+        }
+
+        bool erase(uint64_t order_id) {
+            size_t hole = slotFor(order_id);
+            while (true) {
+                if (!entries[hole].order) return false;
+                if (entries[hole].order_id == order_id) break;
+                hole = (hole + 1) & mask;
+            }
+
+            // Pull later entries of the probe run back into the hole unless
+            // their home slot lies cyclically after it
+            for (size_t i = (hole + 1) & mask; entries[i].order; i = (i + 1) & mask) {
+                size_t home = slotFor(entries[i].order_id);
+                bool stays = (hole < i) ? (home > hole && home <= i) : (home > hole || home <= i);
+                if (!stays) {
+                    entries[hole] = entries[i];
+                    hole = i;
+                }
+            }
+            entries[hole] = {};
+            --count;
+            return true;
+        }
+
+        size_t size() const { return count; }
+
+        // Number of table allocations made so far
+        size_t allocations() const { return table_allocations; }
+
+    private:
+        struct Entry {
+            uint64_t order_id = 0;
+            Order* order = nullptr; // nullptr marks an empty slot
+        };
+
+        std::vector<Entry> entries;
+        size_t mask = 0;
+        size_t count = 0;
+        size_t table_allocations = 0;
+
+        size_t slotFor(uint64_t order_id) const {
+            // Order IDs are sequential, so mix the bits before masking
+            order_id ^= order_id >> 33;
+            order_id *= 0xff51afd7ed558ccdULL;
+            order_id ^= order_id >> 33;
+            return static_cast<size_t>(order_id) & mask;
+        }
+
+        void resize(size_t capacity) {
+            std::vector<Entry> old(capacity);
+            old.swap(entries);
+            mask = capacity - 1;
+            count = 0;
+            ++table_allocations;
+            for (const Entry& entry : old) {
+                if (entry.order) insert(entry.order_id, entry.order);
+            }
+        }
+};
@@ -0,0 +1,54 @@
+#pragma once
+
+#include "order.hpp"
+#include <memory>
+#include <new>
+#include <vector>
+#include <cstddef>
+
+// Free-list slab allocator for resting orders. Slabs are carved into fixed-size
+// slots and are only returned when the pool is destroyed, so once a book has
+// reached its high-water mark, resting and filling orders never hits the heap.
+class OrderPool {
+    public:
+        explicit OrderPool(size_t slab_size = 4096) : slab_size(slab_size) {}
+
+        OrderPool(const OrderPool&) = delete;
+        OrderPool& operator=(const OrderPool&) = delete;
+
+        Order* acquire(const Order& order) {
+            if (!free_list) grow();
+            Slot* slot = free_list;
+            free_list = slot->next;
+            return new (slot->storage) Order(order);
+        }
+
+        void release(Order* order) {
+            order->~Order();
+            Slot* slot = reinterpret_cast<Slot*>(order);
+            slot->next = free_list;
+            free_list = slot;
+        }
+
+        // Number of slab allocations made so far
+        size_t allocations() const { return slabs.size(); }
+
+    private:
+        union Slot {
+            Slot* next;
+            alignas(Order) unsigned char storage[sizeof(Order)];
+        };
+
+        size_t slab_size;
+        std::vector<std::unique_ptr<Slot[]>> slabs;
+        Slot* free_list = nullptr;
+
+        void grow() {
+            slabs.emplace_back(new Slot[slab_size]);
+            Slot* slab = slabs.back().get();
+            for (size_t i = slab_size; i-- > 0;) {
+                slab[i].next = free_list;
+                free_list = &slab[i];
+            }
+        }
+};
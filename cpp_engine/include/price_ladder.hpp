@@ -0,0 +1,220 @@
+#pragma once
+
+#include "price_level.hpp"
+#include <map>
+#include <vector>
+#include <cstdint>
+#include <cstddef>
+#include <functional>
+
+// One side of the book, ordered best-first by `Better`.
+//
+// Levels within `capacity` ticks of a re-centering anchor live in a contiguous
+// array indexed by tick offset, with an occupancy bitmap so the best level is
+// tracked incrementally. Prices outside that window fall back to an ordered
+// tree. The window re-centers on the touch when it moves out of range or when
+// the array drains. A capacity of 0 disables the array entirely.
+//
+// PriceLevel addresses are stable between re-centers; relocating a level
+// re-points Order::level for every order queued on it.
+template <typename Better>
+class PriceLadder {
+    public:
+        explicit PriceLadder(size_t capacity = 0)
+            : slots(capacity, PriceLevel(0)), occupied((capacity + 63) / 64, 0),
+              next_occupied(occupied.size(), 0) {}
+
+        PriceLadder(const PriceLadder&) = delete;
+        PriceLadder& operator=(const PriceLadder&) = delete;
+
+        // True if price `a` has priority over price `b` on this side
+        static bool better(Price a, Price b) { return Better{}(a, b); }
+
+        bool empty() const { return ladder_count == 0 && tree.empty(); }
+
+        const PriceLevel* best() const {
+            const PriceLevel* ladder_best = ladder_count ? &slots[best_idx] : nullptr;
+            if (tree.empty()) return ladder_best;
+            const PriceLevel* tree_best = &tree.begin()->second;
+            if (!ladder_best || better(tree_best->price, ladder_best->price)) return tree_best;
+            return ladder_best;
+        }
+
+        PriceLevel* best() {
+            return const_cast<PriceLevel*>(static_cast<const PriceLadder*>(this)->best());
+        }
+
+        // Level at `price`, or nullptr if there is none
+        const PriceLevel* find(Price price) const {
+            if (inWindow(price)) {
+                size_t idx = static_cast<size_t>(price - base);
+                return isOccupied(idx) ? &slots[idx] : nullptr;
+            }
+            auto it = tree.find(price);
+            return it == tree.end() ? nullptr : &it->second;
+        }
+
+        // Find or create the level at `price`
+        PriceLevel& levelAt(Price price) {
+            if (!slots.empty() && !inWindow(price) &&
+                (ladder_count == 0 || better(price, slots[best_idx].price))) {
+                recenter(price);
+            }
+            if (inWindow(price)) {
+                size_t idx = static_cast<size_t>(price - base);
+                if (!isOccupied(idx)) {
+                    slots[idx].price = price;
+                    markOccupied(idx);
+                    if (ladder_count++ == 0 || better(price, slots[best_idx].price)) best_idx = idx;
+                }
+                return slots[idx];
+            }
+            return tree.try_emplace(price, price).first->second;
+        }
+
+        // Drop an emptied level
+        void erase(PriceLevel* level) {
+            if (!inLadder(level)) {
+                Price price = level->price;
+                tree.erase(price);
+                return;
+            }
+            size_t idx = static_cast<size_t>(level - slots.data());
+            clearOccupied(idx);
+            --ladder_count;
+            if (ladder_count && idx == best_idx) best_idx = scanWorse(idx);
+            if (ladder_count == 0 && !tree.empty()) recenter(tree.begin()->first);
+        }
+
+        // Visit levels best-first until `visit` returns false
+        template <typename F>
+        void forEach(F&& visit) const {
+            auto it = tree.begin();
+            size_t idx = ladder_count ? best_idx : npos;
+            while (it != tree.end() || idx != npos) {
+                const PriceLevel* level;
+                if (idx == npos || (it != tree.end() && better(it->first, slots[idx].price))) {
+                    level = &it->second;
+                    ++it;
+                } else {
+                    level = &slots[idx];
+                    idx = stepWorse(idx);
+                }
+                if (!visit(*level)) return;
+            }
+        }
+
+    private:
+        static constexpr size_t npos = static_cast<size_t>(-1);
+        static constexpr bool kHigherIsBetter = Better{}(Price{1}, Price{0});
+
+        std::map<Price, PriceLevel, Better> tree; // Far-from-touch fallback
+        std::vector<PriceLevel> slots;            // slots[i] holds price base + i
+        std::vector<uint64_t> occupied;           // One bit per slot
+        std::vector<uint64_t> next_occupied;      // Scratch bitmap for recenter
+        Price base = 0;
+        size_t ladder_count = 0;
+        size_t best_idx = 0;
+
+        bool inWindow(Price price) const {
+            return !slots.empty() && price >= base && price - base < static_cast<Price>(slots.size());
+        }
+        bool inLadder(const PriceLevel* level) const {
+            std::less<const PriceLevel*> before;
+            return !slots.empty() && !before(level, slots.data()) && before(level, slots.data() + slots.size());
+        }
+
+        bool isOccupied(size_t idx) const { return (occupied[idx / 64] >> (idx % 64)) & 1; }
+        void markOccupied(size_t idx) { occupied[idx / 64] |= uint64_t{1} << (idx % 64); }
+        void clearOccupied(size_t idx) { occupied[idx / 64] &= ~(uint64_t{1} << (idx % 64)); }
+
+        // First occupied slot at or behind `idx` in priority order, or npos
+        size_t scanWorse(size_t idx) const {
+            size_t word = idx / 64;
+            if constexpr (kHigherIsBetter) {
+                uint64_t bits = occupied[word] & (~uint64_t{0} >> (63 - idx % 64));
+                while (true) {
+                    if (bits) return word * 64 + 63 - static_cast<size_t>(__builtin_clzll(bits));
+                    if (word == 0) return npos;
+                    bits = occupied[--word];
+                }
+            } else {
+                uint64_t bits = occupied[word] & (~uint64_t{0} << (idx % 64));
+                while (true) {
+                    if (bits) return word * 64 + static_cast<size_t>(__builtin_ctzll(bits));
+                    if (++word == occupied.size()) return npos;
+                    bits = occupied[word];
+                }
+            }
+        }
+
+        // Next occupied slot strictly behind `idx` in priority order, or npos
+        size_t stepWorse(size_t idx) const {
+            if constexpr (kHigherIsBetter) {
+                return idx == 0 ? npos : scanWorse(idx - 1);
+            } else {
+                return idx + 1 == slots.size() ? npos : scanWorse(idx + 1);
+            }
+        }
+
+        static void relocate(PriceLevel& from, PriceLevel& to) {
+            to = from;
+            for (Order* order = to.head; order; order = order->next) order->level = &to;
+            from.head = from.tail = nullptr;
+            from.total_quantity = 0;
+            from.order_count = 0;
+        }
+
+        // Move the window so it is centred on `center`. Array levels that stay
+        // inside slide to their new slot, the rest spill into the tree, and tree
+        // levels that now fall inside the window are pulled in.
+        void recenter(Price center) {
+            const Price size = static_cast<Price>(slots.size());
+            const Price new_base = center - size / 2;
+            std::fill(next_occupied.begin(), next_occupied.end(), 0);
+
+            // Walk in the direction of the shift so each destination slot has
+            // already been vacated by the time something moves into it
+            auto move = [&](size_t idx) {
+                Price price = slots[idx].price;
+                if (price >= new_base && price - new_base < size) {
+                    size_t to = static_cast<size_t>(price - new_base);
+                    if (to != idx) relocate(slots[idx], slots[to]);
+                    next_occupied[to / 64] |= uint64_t{1} << (to % 64);
+                } else {
+                    relocate(slots[idx], tree.try_emplace(price, price).first->second);
+                }
+            };
+            if (new_base > base) {
+                for (size_t word = 0; word < occupied.size(); ++word) {
+                    for (uint64_t bits = occupied[word]; bits; bits &= bits - 1) {
+                        move(word * 64 + static_cast<size_t>(__builtin_ctzll(bits)));
+                    }
+                }
+            } else {
+                for (size_t word = occupied.size(); word-- > 0;) {
+                    for (uint64_t bits = occupied[word]; bits;) {
+                        size_t bit = 63 - static_cast<size_t>(__builtin_clzll(bits));
+                        bits &= ~(uint64_t{1} << bit);
+                        move(word * 64 + bit);
+                    }
+                }
+            }
+            occupied.swap(next_occupied);
+            base = new_base;
+
+            Price top = base + size - 1;
+            auto first = tree.lower_bound(kHigherIsBetter ? top : base);
+            auto last = tree.upper_bound(kHigherIsBetter ? base : top);
+            for (auto it = first; it != last; ++it) {
+                size_t idx = static_cast<size_t>(it->first - base);
+                relocate(it->second, slots[idx]);
+                markOccupied(idx);
+            }
+            tree.erase(first, last);
+
+            ladder_count = 0;
+            for (uint64_t word : occupied) ladder_count += static_cast<size_t>(__builtin_popcountll(word));
+            if (ladder_count) best_idx = scanWorse(kHigherIsBetter ? slots.size() - 1 : 0);
+        }
+};
@@ -0,0 +1,41 @@
+#pragma once
+
+#include "order.hpp"
+#include <cstddef>
+
+// A single price level: aggregate quantity plus an intrusive FIFO list of the
+// orders resting at that price. Orders are linked through Order::prev/next so
+// the level never copies or reallocates them.
+struct PriceLevel {
+    Price price;
+    Qty total_quantity = 0;
+    size_t order_count = 0;
+    Order* head = nullptr;
+    Order* tail = nullptr;
+
+    explicit PriceLevel(Price p) : price(p) {}
+
+    bool empty() const { return head == nullptr; }
+
+    void push_back(Order* order) {
+        order->prev = tail;
+        order->next = nullptr;
+        if (tail) tail->next = order;
+        else head = order;
+        tail = order;
+        order->level = this;
+        total_quantity += order->quantity;
+        ++order_count;
+    }
+
+    void remove(Order* order) {
+        if (order->prev) order->prev->next = order->next;
+        else head = order->next;
+        if (order->next) order->next->prev = order->prev;
+        else tail = order->prev;
+        order->prev = order->next = nullptr;
+        order->level = nullptr;
+        total_quantity -= order->quantity;
+        --order_count;
+    }
+};
@@ -0,0 +1,65 @@
+#pragma once
+
+#include <atomic>
+#include <vector>
+#include <cstdint>
+#include <cstddef>
+
+// Bounded single-producer/single-consumer queue. Storage is allocated once;
+// push never blocks and drops the element (counting it) when the ring is
+// full, so a slow consumer cannot stall the producer.
+template <typename T>
+class SpscRing {
+    public:
+        // Capacity is rounded up to a power of two
+        explicit SpscRing(size_t capacity) : buffer(roundUp(capacity)), mask(buffer.size() - 1) {}
+
+        SpscRing(const SpscRing&) = delete;
+        SpscRing& operator=(const SpscRing&) = delete;
+
+        // Producer side
+        bool push(const T& item) {
+            size_t t = tail.load(std::memory_order_relaxed);
+            if (t - cached_head == buffer.size()) {
+                cached_head = head.load(std::memory_order_acquire);
+                if (t - cached_head == buffer.size()) {
+                    dropped.fetch_add(1, std::memory_order_relaxed);
+                    return false;
+                }
+            }
+            buffer[t & mask] = item;
+            tail.store(t + 1, std::memory_order_release);
+            return true;
+        }
+
+        // Consumer side: move up to `max` items into `out`, oldest first
+        size_t pop(T* out, size_t max) {
+            size_t h = head.load(std::memory_order_relaxed);
+            size_t available = tail.load(std::memory_order_acquire) - h;
+            size_t n = available < max ? available : max;
+            for (size_t i = 0; i < n; ++i) out[i] = buffer[(h + i) & mask];
+            head.store(h + n, std::memory_order_release);
+            return n;
+        }
+
+        // Consumer side: items ready to pop (more may arrive concurrently)
+        size_t size() const { return tail.load(std::memory_order_acquire) - head.load(std::memory_order_relaxed); }
+        bool empty() const { return head.load(std::memory_order_acquire) == tail.load(std::memory_order_acquire); }
+        size_t capacity() const { return buffer.size(); }
+        // Items rejected because the ring was full
+        uint64_t droppedCount() const { return dropped.load(std::memory_order_relaxed); }
+
+    private:
+        static size_t roundUp(size_t n) {
+            size_t size = 1;
+            while (size < n) size <<= 1;
+            return size;
+        }
+
+        std::vector<T> buffer;
+        const size_t mask;
+        alignas(64) std::atomic<size_t> head{0}; // Next slot to read; written by the consumer
+        alignas(64) std::atomic<size_t> tail{0}; // Next slot to write; written by the producer
+        size_t cached_head = 0;                  // Producer's last view of head
+        std::atomic<uint64_t> dropped{0};
+};
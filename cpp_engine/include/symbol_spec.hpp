@@ -0,0 +1,37 @@
+#pragma once
+
+#include "order.hpp"
+#include <cmath>
+#include <algorithm>
+
+// Per-symbol price/quantity granularity. The matching path works purely in
+// integer ticks and lots; these helpers convert at the API boundary.
+struct SymbolSpec {
+    double tick_size = 0.01;
+    double lot_size = 1e-8;
+
+    // Largest tick/lot count accepted: doubles hold every integer up to 2^53,
+    // and level totals stay far from int64 overflow
+    static constexpr double kMaxUnits = 9007199254740992.0;
+
+    // Limit price in ticks, rounded toward the passive side so an order never
+    // fills worse than its limit: buys round down, sells round up. Prices
+    // within floating-point noise of a tick snap to it. Returns 0 for
+    // non-finite, negative or out-of-range prices.
+    Price toTicks(double price, Side side) const {
+        double ticks = price / tick_size;
+        if (!(ticks >= 0.0 && ticks <= kMaxUnits)) return 0; // Also catches NaN
+        double nearest = std::round(ticks);
+        if (std::abs(ticks - nearest) <= 1e-9 * std::max(1.0, nearest)) return static_cast<Price>(nearest);
+        return static_cast<Price>(side == Side::BUY ? std::floor(ticks) : std::ceil(ticks));
+    }
+    // Quantity in lots, rounded to the nearest lot. Returns 0 for non-finite,
+    // negative or out-of-range quantities.
+    Qty toLots(double quantity) const {
+        double lots = quantity / lot_size;
+        if (!(lots >= 0.0 && lots <= kMaxUnits)) return 0;
+        return static_cast<Qty>(std::llround(lots));
+    }
+    double fromTicks(Price ticks) const { return static_cast<double>(ticks) * tick_size; }
+    double fromLots(Qty lots) const { return static_cast<double>(lots) * lot_size; }
+};
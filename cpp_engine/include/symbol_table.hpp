@@ -0,0 +1,42 @@
+#pragma once
+
+#include <cstdint>
+#include <deque>
+#include <mutex>
+#include <string>
+#include <unordered_map>
+
+// Process-wide symbol interning. Hot structures such as Trade carry a compact
+// numeric ID; the name is only looked up when a consumer asks for it.
+class SymbolTable {
+    public:
+        static uint32_t intern(const std::string& symbol) {
+            Registry& registry = instance();
+            std::lock_guard<std::mutex> lock(registry.mtx);
+            auto it = registry.ids.find(symbol);
+            if (it != registry.ids.end()) return it->second;
+
+            uint32_t id = static_cast<uint32_t>(registry.names.size());
+            registry.names.push_back(symbol);
+            registry.ids.emplace(symbol, id);
+            return id;
+        }
+
+        static std::string name(uint32_t symbol_id) {
+            Registry& registry = instance();
+            std::lock_guard<std::mutex> lock(registry.mtx);
+            return symbol_id < registry.names.size() ? registry.names[symbol_id] : std::string();
+        }
+
+    private:
+        struct Registry {
+            std::mutex mtx;
+            std::unordered_map<std::string, uint32_t> ids;
+            std::deque<std::string> names;
+        };
+
+        static Registry& instance() {
+            static Registry registry;
+            return registry;
+        }
+};
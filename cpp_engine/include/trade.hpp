@@ -1,13 +1,14 @@
 #pragma once
 
-#include <string>
+#include <cstdint>
 #include "order.hpp"
 
 struct Trade {
     uint64_t trade_id;
-    std::string symbol;
-    Price price;
-    Qty quantity;
+    uint32_t symbol_id; // Resolve through SymbolTable
+    uint64_t seq;       // Per-symbol sequence: 1, 2, 3, ... with no gaps
+    double price;    // Decimal units; the book converts from ticks/lots
+    double quantity; // when it reports the fill
     Timestamp timestamp;
     uint64_t maker_order_id;
     uint64_t taker_order_id;
@@ -0,0 +1,69 @@
+#pragma once
+
+#include "trade.hpp"
+#include <vector>
+#include <cstdint>
+#include <cstddef>
+#include <algorithm>
+
+// Fixed-capacity trade history. Storage is allocated once up front; when full,
+// each new trade overwrites the oldest one so memory stays flat regardless of
+// uptime. Trades are stored in execution order, so trade IDs and sequence
+// numbers are increasing.
+class TradeRing {
+    public:
+        explicit TradeRing(size_t capacity) : buffer(capacity) {}
+
+        void push(const Trade& trade) {
+            if (buffer.empty()) return;
+            buffer[next] = trade;
+            next = (next + 1) % buffer.size();
+            if (count < buffer.size()) ++count;
+        }
+
+        // Append every retained trade with an ID greater than `trade_id`,
+        // oldest first
+        void since(uint64_t trade_id, std::vector<Trade>& out) const {
+            append(firstAfter(&Trade::trade_id, trade_id), out);
+        }
+
+        // Append every retained trade with a sequence number greater than
+        // `seq`, oldest first. Returns false, appending nothing, if trade
+        // seq + 1 has already been overwritten.
+        bool sinceSeq(uint64_t seq, std::vector<Trade>& out) const {
+            size_t first = firstAfter(&Trade::seq, seq);
+            if (first == 0 && count > 0 && at(0).seq > seq + 1) return false;
+            append(first, out);
+            return true;
+        }
+
+        size_t size() const { return count; }
+        size_t capacity() const { return buffer.size(); }
+
+    private:
+        std::vector<Trade> buffer;
+        size_t next = 0;  // Slot the next trade is written to
+        size_t count = 0;
+
+        // Logical position (0 = oldest) of the first trade whose `key`
+        // exceeds `value`; binary search, as the ring is in execution order
+        size_t firstAfter(uint64_t Trade::*key, uint64_t value) const {
+            size_t lo = 0, hi = count;
+            while (lo < hi) {
+                size_t mid = lo + (hi - lo) / 2;
+                if (at(mid).*key <= value) lo = mid + 1;
+                else hi = mid;
+            }
+            return lo;
+        }
+
+        void append(size_t first, std::vector<Trade>& out) const {
+            out.reserve(out.size() + (count - first));
+            for (size_t i = first; i < count; ++i) out.push_back(at(i));
+        }
+
+        const Trade& at(size_t logical) const {
+            size_t oldest = (next + buffer.size() - count) % buffer.size();
+            return buffer[(oldest + logical) % buffer.size()];
+        }
+};
@@ -1,73 +1,190 @@
 #include "include/order_book.hpp"
+#include <cstring>
 
 
 
+// Reads the published image, so it never takes the book lock
 std::pair<std::pair<double, double>, std::pair<double, double>> OrderBook::getBBO() const{
     double bestbidprice = 0.0;
     double bestbidqty = 0.0;
     double bestaskprice = 0.0;
     double bestaskqty = 0.0;
 
-    if(!bid_levels.empty()){
-        bestbidprice = bid_levels.begin()->first;
-        bestbidqty = bid_levels.begin()->second;
+    DepthImage image = published.read();
+    if(image.bid_count){
+        bestbidprice = spec.fromTicks(image.bids[0].price);
+        bestbidqty = spec.fromLots(image.bids[0].quantity);
     }
-    if(!ask_levels.empty()){
-        bestaskprice = ask_levels.begin()->first;
-        bestaskqty = ask_levels.begin()->second;
+    if(image.ask_count){
+        bestaskprice = spec.fromTicks(image.asks[0].price);
+        bestaskqty = spec.fromLots(image.asks[0].quantity);
     }
     return {{bestbidprice, bestbidqty}, {bestaskprice, bestaskqty}};
 }
 
 
-nlohmann::json OrderBook::getSnapshot(size_t depth)const{
+// Visit the top `depth` levels of each side, best first, and return the
+// version they reflect. Depths covered by the published image are served
+// lock-free; deeper requests walk the book under the lock.
+template <typename Visit>
+uint64_t OrderBook::visitDepth(size_t depth, Visit&& visit) const{
+    if(depth <= kImageDepth){
+        DepthImage image = published.read();
+        for(size_t i = 0; i < std::min<size_t>(depth, image.bid_count); ++i) visit(Side::BUY, image.bids[i]);
+        for(size_t i = 0; i < std::min<size_t>(depth, image.ask_count); ++i) visit(Side::SELL, image.asks[i]);
+        return image.version;
+    }
+
+    std::lock_guard<std::mutex> lock(mtx);
+    size_t count = 0;
+    bid_levels.forEach([&](const PriceLevel& level){
+        visit(Side::BUY, DepthLevel{level.price, level.total_quantity});
+        return ++count < depth;
+    });
+    count = 0;
+    ask_levels.forEach([&](const PriceLevel& level){
+        visit(Side::SELL, DepthLevel{level.price, level.total_quantity});
+        return ++count < depth;
+    });
+    return book_version.load(std::memory_order_relaxed);
+}
+
+uint64_t OrderBook::getLevels(size_t depth, std::vector<DepthLevel>& bids, std::vector<DepthLevel>& asks) const{
+    std::lock_guard<std::mutex> lock(mtx);
+    auto collect = [depth](std::vector<DepthLevel>& out){
+        return [&out, depth](const PriceLevel& level){
+            out.push_back({level.price, level.total_quantity});
+            return depth == 0 || out.size() < depth;
+        };
+    };
+    bid_levels.forEach(collect(bids));
+    ask_levels.forEach(collect(asks));
+    return deltas.lastSeq();
+}
+
+uint64_t OrderBook::getDepth(size_t depth, std::vector<DepthLevel>& bids, std::vector<DepthLevel>& asks) const{
+    return visitDepth(depth, [&](Side side, const DepthLevel& level){
+        (side == Side::BUY ? bids : asks).push_back(level);
+    });
+}
+
+
+std::shared_ptr<const BookSnapshot> OrderBook::getSnapshot(size_t depth)const{
+
+    // One consistent read of both sides; the BBO comes from the same view,
+    // or from its own read of the top level when no levels were asked for
+    std::vector<DepthLevel> bids, asks, top_bids, top_asks;
+    uint64_t version = depth ? getDepth(depth, bids, asks) : getDepth(1, top_bids, top_asks);
+    const std::vector<DepthLevel>& bbo_bids = depth ? bids : top_bids;
+    const std::vector<DepthLevel>& bbo_asks = depth ? asks : top_asks;
+
+    {
+        std::lock_guard<std::mutex> lock(snapshot_mtx);
+        auto it = snapshot_cache.find(depth);
+        if(it != snapshot_cache.end() && it->second->version == version) return it->second;
+    }
 
     nlohmann::json snapshot;
     snapshot["symbol"]= symbol;
+    snapshot["version"]= version;
 
     auto now = std::chrono::system_clock::now();
     auto t = std::chrono::system_clock::to_time_t(now);
     auto us = std::chrono::duration_cast<std::chrono::microseconds>(
         now.time_since_epoch()
     ).count() % 1000000;
+    std::tm utc{};
+    gmtime_r(&t, &utc); // Reentrant: snapshots are taken concurrently
     std::ostringstream oss;
-    oss << std::put_time(std::gmtime(&t), "%FT%T") << "." << std::setw(6)
+    oss << std::put_time(&utc, "%FT%T") << "." << std::setw(6)
         << std::setfill('0') << us << "Z";
     snapshot["timestamp"] = oss.str();
 
 
     // BBO
 
-    auto [bid, ask] = getBBO();
+    DepthLevel bid = bbo_bids.empty() ? DepthLevel{0, 0} : bbo_bids.front();
+    DepthLevel ask = bbo_asks.empty() ? DepthLevel{0, 0} : bbo_asks.front();
     snapshot["bbo"] = {
-        {"bid", {{"price", bid  .first}, {"quantity", bid.second}}},
-        {"ask", {{"price", ask.first}, {"quantity", ask.second}}}
+        {"bid", {{"price", spec.fromTicks(bid.price)}, {"quantity", spec.fromLots(bid.quantity)}}},
+        {"ask", {{"price", spec.fromTicks(ask.price)}, {"quantity", spec.fromLots(ask.quantity)}}}
     };
 
 
     // Top N bids
 
     nlohmann::json bids_array = nlohmann::json::array();
-    size_t count = 0;
-    for(const auto& [price, qty] : bid_levels){
-        if(++count >= depth) break;
-        bids_array.push_back({{"price", price}, {"quantity", qty}});
+    for(const DepthLevel& level : bids){
+        bids_array.push_back({{"price", spec.fromTicks(level.price)}, {"quantity", spec.fromLots(level.quantity)}});
     }
     snapshot["bids"] = bids_array;
 
 
     // Top N asks
     nlohmann::json asks_array = nlohmann::json::array();
-    count = 0;
-    for (auto& [price, qty] : ask_levels) {
-        asks_array.push_back({{"price", price}, {"quantity", qty}});
-        if (++count >= depth) break;
+    for(const DepthLevel& level : asks){
+        asks_array.push_back({{"price", spec.fromTicks(level.price)}, {"quantity", spec.fromLots(level.quantity)}});
     }
 
-   
+
     snapshot["asks"] = asks_array;
 
 
-    return snapshot;
-    
-}
\ No newline at end of file
+    auto rendered = std::make_shared<const BookSnapshot>(BookSnapshot{version, std::move(snapshot)});
+    std::lock_guard<std::mutex> lock(snapshot_mtx);
+    auto& cached = snapshot_cache[depth];
+    if(!cached || cached->version < version) cached = rendered;
+    return rendered;
+
+}
+
+
+std::shared_ptr<const SnapshotBytes> OrderBook::getSnapshotBytes(size_t depth, SnapshotFormat format) const{
+    const size_t key = depth * 2 + static_cast<size_t>(format);
+    auto cached = [&](uint64_t version) -> std::shared_ptr<const SnapshotBytes> {
+        std::lock_guard<std::mutex> lock(snapshot_mtx);
+        auto it = snapshot_bytes_cache.find(key);
+        if(it != snapshot_bytes_cache.end() && it->second->version == version) return it->second;
+        return nullptr;
+    };
+
+    std::shared_ptr<const SnapshotBytes> rendered;
+    if(format == SnapshotFormat::JSON){
+        auto snapshot = getSnapshot(depth);
+        if(auto hit = cached(snapshot->version)) return hit;
+        rendered = std::make_shared<const SnapshotBytes>(SnapshotBytes{snapshot->version, snapshot->json.dump()});
+    } else {
+        std::vector<DepthLevel> bids, asks;
+        uint64_t version = getDepth(depth, bids, asks);
+        if(auto hit = cached(version)) return hit;
+
+        const uint8_t layout = 1;
+        const int64_t timestamp = std::chrono::duration_cast<std::chrono::microseconds>(
+            std::chrono::system_clock::now().time_since_epoch()).count();
+        const uint32_t bid_count = static_cast<uint32_t>(bids.size());
+        const uint32_t ask_count = static_cast<uint32_t>(asks.size());
+
+        std::string data(32 + 16 * (bids.size() + asks.size()), '\0');
+        char* out = data.data();
+        std::memcpy(out, &layout, 1);
+        std::memcpy(out + 4, &symbol_id, 4);
+        std::memcpy(out + 8, &version, 8);
+        std::memcpy(out + 16, &timestamp, 8);
+        std::memcpy(out + 24, &bid_count, 4);
+        std::memcpy(out + 28, &ask_count, 4);
+        out += 32;
+        for(const auto* side : {&bids, &asks}){
+            for(const DepthLevel& level : *side){
+                double row[2] = {spec.fromTicks(level.price), spec.fromLots(level.quantity)};
+                std::memcpy(out, row, sizeof(row));
+                out += sizeof(row);
+            }
+        }
+        rendered = std::make_shared<const SnapshotBytes>(SnapshotBytes{version, std::move(data)});
+    }
+
+    std::lock_guard<std::mutex> lock(snapshot_mtx);
+    auto& slot = snapshot_bytes_cache[key];
+    if(!slot || slot->version < rendered->version) slot = rendered;
+    return rendered;
+}
@@ -3,17 +3,33 @@
 #include <iostream>
 #include <vector>
 #include <random>
+#include <atomic>
+#include <new>
+#include <cstdlib>
+
+// Count every heap allocation in the process so the benchmark can show that
+// steady-state matching does not allocate
+static std::atomic<size_t> heap_allocations{0};
+
+void* operator new(std::size_t size) {
+    heap_allocations.fetch_add(1, std::memory_order_relaxed);
+    if (void* p = std::malloc(size ? size : 1)) return p;
+    throw std::bad_alloc();
+}
+void operator delete(void* p) noexcept { std::free(p); }
+void operator delete(void* p, std::size_t) noexcept { std::free(p); }
 
 void prefillOrderBook(OrderBook &ob, int levels, int qty_per_level) {
+    // Levels are 0.25 apart so 200,000 bid levels stay above zero
     // Fill BIDs
     for (int i = 0; i < levels; ++i) {
-        double price = 60000 - i; // descending for bids
+        double price = 60000 - i * 0.25; // descending for bids
         ob.addOrder(price, qty_per_level, "BUY", "LIMIT");
     }
 
     // Fill ASKS
     for (int i = 0; i < levels; ++i) {
-        double price = 60001 + i; // ascending for asks
+        double price = 60001 + i * 0.25; // ascending for asks
         ob.addOrder(price, qty_per_level, "SELL", "LIMIT");
     }
 }
@@ -23,28 +39,34 @@ void benchmarkOrders(OrderBook &ob, int num_orders, bool market) {
     std::uniform_real_distribution<double> price_dist(59950, 60050);
     std::uniform_real_distribution<double> qty_dist(0.01, 2.0);
 
+    const OrderType type = market ? OrderType::MARKET : OrderType::LIMIT;
+    std::vector<Trade> fills;
+    fills.reserve(1024);
+
+    size_t allocs_before = heap_allocations.load();
+    size_t book_allocs_before = ob.getAllocationCount();
     auto start = std::chrono::high_resolution_clock::now();
 
     for (int i = 0; i < num_orders; ++i) {
         double price = price_dist(gen);
         double qty = qty_dist(gen);
-        std::string side = (i % 2 == 0) ? "BUY" : "SELL";
-        std::string type = market ? "MARKET" : "LIMIT";
 
-        ob.addOrder(price, qty, side, type);
+        fills.clear();
+        ob.addOrder(price, qty, (i % 2 == 0) ? Side::BUY : Side::SELL, type, fills);
     }
 
     auto end = std::chrono::high_resolution_clock::now();
+    size_t allocs = heap_allocations.load() - allocs_before;
+    size_t book_allocs = ob.getAllocationCount() - book_allocs_before;
     double duration_sec = std::chrono::duration<double>(end - start).count();
     std::cout << (market ? "MARKET" : "LIMIT")
               << " orders processed: " << num_orders
               << " in " << duration_sec << " sec ("
-              << num_orders / duration_sec << " orders/sec)\n";
+              << num_orders / duration_sec << " orders/sec), heap allocations: "
+              << allocs << " (order pool/index: " << book_allocs << ")\n";
 }
 
-int main() {
-    OrderBook ob("BTC-USDT");
-
+void runBenchmark(OrderBook &ob) {
     // Step 1: Pre-fill book with 200,000 levels each side
     std::cout << "Prefilling order book...\n";
     prefillOrderBook(ob, 200000, 1);
@@ -54,6 +76,17 @@ int main() {
 
     // Step 3: Benchmark LIMIT orders
     benchmarkOrders(ob, 200000, false);
+}
+
+int main() {
+    std::cout << "[tree levels]\n";
+    OrderBook tree_book("BTC-USDT");
+    runBenchmark(tree_book);
+
+    // Dense ladder covering +/- $160 around the touch at the default 0.01 tick
+    std::cout << "[ladder levels]\n";
+    OrderBook ladder_book("BTC-USDT", 0.01, 1e-8, 32768);
+    runBenchmark(ladder_book);
 
     return 0;
 }
@@ -0,0 +1,31 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from app.books import books
+from app.main import app
+from app.routes import marketdata_routes, tradedata_routes
+
+
+def _reset_app_state():
+    """Drop every module-level book, thread and stream the app has built."""
+    for worker in books.workers.values():
+        worker.close()
+    for notifier in books.notifiers.values():
+        notifier.close()
+    for cache in (books.workers, books.notifiers, books.order_books,
+                  marketdata_routes.publishers, tradedata_routes.hubs):
+        cache.clear()
+
+
+@pytest.fixture
+def reset_app():
+    """Start and end the test with no books, matching threads or streams."""
+    _reset_app_state()
+    yield
+    _reset_app_state()
+
+
+@pytest.fixture
+def client(reset_app):
+    with TestClient(app) as client:
+        yield client
@@ -0,0 +1,60 @@
+import asyncio
+import threading
+import pytest
+import matching_engine
+
+from app.books.books import BookWorker
+
+
+@pytest.fixture
+def worker():
+    worker = BookWorker("TEST-W", matching_engine.OrderBook("TEST-W"))
+    yield worker
+    worker.close()
+
+
+def _add(book):
+    return book.add_order(100.0, 1.0, "BUY", "LIMIT").order_id
+
+
+def test_results_and_errors_reach_the_caller(worker):
+    async def main():
+        assert await worker.submit(_add) > 0
+        with pytest.raises(ValueError):
+            await worker.submit(matching_engine.OrderBook.add_order, 100.0, 1.0, "HOLD", "LIMIT")
+    asyncio.run(main())
+
+
+def test_worker_survives_a_closed_loop_and_base_exceptions(worker):
+    release = threading.Event()
+
+    def blocked(book):
+        release.wait()
+        return _add(book)
+
+    # Queue a request, then close its loop before the worker completes it
+    async def abandon():
+        worker.submit(blocked)
+    asyncio.run(abandon())
+    release.set()
+
+    def interrupted(book):
+        raise KeyboardInterrupt
+
+    async def main():
+        with pytest.raises(KeyboardInterrupt):
+            await worker.submit(interrupted)
+        return await asyncio.wait_for(worker.submit(_add), 5)
+
+    assert asyncio.run(main()) > 0
+    assert worker.thread.is_alive()
+
+
+def test_close_runs_queued_requests_then_stops(worker):
+    async def main():
+        pending = worker.submit(_add)
+        worker.close()
+        return await pending
+
+    assert asyncio.run(main()) > 0
+    assert not worker.thread.is_alive()
@@ -0,0 +1,106 @@
+import pytest
+import matching_engine
+
+from app.books import books
+
+BUY = matching_engine.Side.BUY
+SELL = matching_engine.Side.SELL
+LIMIT = matching_engine.OrderType.LIMIT
+
+
+@pytest.fixture
+def book():
+    return matching_engine.OrderBook("TEST-CM")
+
+
+def test_same_price_reduction_keeps_priority(book):
+    first = book.add_order(100.0, 2.0, SELL, LIMIT).order_id
+    second = book.add_order(100.0, 2.0, SELL, LIMIT).order_id
+
+    assert book.modify_order(first, 1.0, 100.0) == []
+
+    fills = book.add_order(100.0, 1.0, BUY, LIMIT).trades
+    assert [t.maker_order_id for t in fills] == [first]
+    assert book.get_bbo()[1] == (100.0, 2.0)  # Only `second` is left
+
+
+def test_price_change_loses_priority(book):
+    first = book.add_order(100.0, 1.0, SELL, LIMIT).order_id
+    second = book.add_order(100.0, 1.0, SELL, LIMIT).order_id
+
+    assert book.modify_order(first, 1.0, 101.0) == []
+    assert book.modify_order(first, 1.0, 100.0) == []
+
+    fills = book.add_order(100.0, 2.0, BUY, LIMIT).trades
+    assert [t.maker_order_id for t in fills] == [second, first]
+
+
+def test_quantity_increase_loses_priority(book):
+    first = book.add_order(100.0, 1.0, SELL, LIMIT).order_id
+    second = book.add_order(100.0, 1.0, SELL, LIMIT).order_id
+
+    assert book.modify_order(first, 2.0, 100.0) == []
+
+    fills = book.add_order(100.0, 1.0, BUY, LIMIT).trades
+    assert [t.maker_order_id for t in fills] == [second]
+
+
+def test_modify_can_cross(book):
+    resting = book.add_order(100.0, 1.0, BUY, LIMIT).order_id
+    ask = book.add_order(101.0, 1.0, SELL, LIMIT).order_id
+
+    fills = book.modify_order(ask, 1.0, 100.0)
+    assert [(t.maker_order_id, t.taker_order_id) for t in fills] == [(resting, ask)]
+    assert book.cancel_order(ask) is False
+
+
+def test_missing_order(book):
+    assert book.modify_order(12345678, 1.0, 100.0) is None
+    assert book.cancel_order(12345678) is False
+
+    order_id = book.add_order(100.0, 1.0, BUY, LIMIT).order_id
+    assert book.cancel_order(order_id) is True
+    assert book.cancel_order(order_id) is False
+    assert book.modify_order(order_id, 1.0, 100.0) is None
+
+
+def _submit(client, side, price, quantity):
+    response = client.post("/api/v1/orders", json={
+        "symbol": "BTC-USD", "side": side, "order_type": "LIMIT", "price": price, "quantity": quantity,
+    })
+    assert response.status_code == 200
+    return response.json()["order"]["order_id"]
+
+
+def test_delete_route(client):
+    order_id = _submit(client, "BUY", 100.0, 1.0)
+
+    assert client.delete(f"/api/v1/orders/{order_id}").json() == {
+        "status": "success", "symbol": "BTC-USD", "order_id": order_id,
+    }
+    assert client.delete(f"/api/v1/orders/{order_id}").json() == {
+        "status": "error", "message": "Order not found.",
+    }
+    assert client.delete(f"/api/v1/orders/{order_id}", params={"symbol": "ETH-USD"}).json() == {
+        "status": "error", "message": "Invalid or missing symbol.",
+    }
+
+
+def test_patch_route(client):
+    resting = _submit(client, "BUY", 100.0, 1.0)
+    order_id = _submit(client, "SELL", 101.0, 1.0)
+
+    response = client.patch(f"/api/v1/orders/{order_id}", json={"price": 101.5, "quantity": 0.5})
+    assert response.json() == {
+        "status": "success", "symbol": "BTC-USD", "order_id": order_id, "trades_executed": 0,
+    }
+
+    response = client.patch(f"/api/v1/orders/{order_id}", json={"price": 100.0, "quantity": 0.5})
+    assert response.json()["trades_executed"] == 1
+    assert books.order_books["BTC-USD"].get_bbo()[0] == (100.0, 0.5)
+
+    response = client.patch(f"/api/v1/orders/{order_id}", json={"price": 100.0, "quantity": 0.5})
+    assert response.json() == {"status": "error", "message": "Order not found."}
+
+    response = client.patch(f"/api/v1/orders/{resting}", json={"price": -1, "quantity": 1})
+    assert response.json()["status"] == "error"
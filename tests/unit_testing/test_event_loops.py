@@ -0,0 +1,27 @@
+import json
+from fastapi.testclient import TestClient
+
+from app.main import app
+
+
+def _order(side, price):
+    return {"symbol": "BTC-USD", "side": side, "order_type": "LIMIT", "price": price, "quantity": 1.0}
+
+
+def _session(price):
+    # Each TestClient session runs the app on a fresh event loop; the
+    # module-level books, notifiers, publishers and hubs carry over
+    with TestClient(app) as client:
+        client.post("/api/v1/orders", json=_order("BUY", price))
+        with client.websocket_connect("/api/v1/marketdata") as market, \
+                client.websocket_connect("/api/v1/trades") as trades:
+            market.receive_json()  # Join snapshot
+
+            client.post("/api/v1/orders", json=_order("SELL", price))
+            assert market.receive_json()["snapshot"]["version"] > 0
+            assert json.loads(trades.receive_text())["trade"]["price"] == price
+
+
+def test_streams_survive_a_new_event_loop(reset_app):
+    _session(100.0)
+    _session(99.0)
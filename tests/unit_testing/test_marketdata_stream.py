@@ -0,0 +1,76 @@
+import asyncio
+import json
+import matching_engine
+
+from app.books.books import BookNotifier
+
+
+def _order(side, price, quantity=1.0):
+    return {"symbol": "BTC-USD", "side": side, "order_type": "LIMIT", "price": price, "quantity": quantity}
+
+
+def test_snapshots_are_text_frames(client):
+    client.post("/api/v1/orders", json=_order("BUY", 100.0))
+    with client.websocket_connect("/api/v1/marketdata") as ws:
+        snapshot = json.loads(ws.receive_text())["snapshot"]
+        assert snapshot["bids"] == [{"price": 100.0, "quantity": 1.0}]
+
+        client.post("/api/v1/orders", json=_order("SELL", 101.0))
+        snapshot = json.loads(ws.receive_text())["snapshot"]
+        assert snapshot["asks"] == [{"price": 101.0, "quantity": 1.0}]
+
+
+def test_deltas_are_text_frames(client):
+    client.post("/api/v1/orders", json=_order("BUY", 100.0))
+    with client.websocket_connect("/api/v1/marketdata?mode=delta") as ws:
+        book = ws.receive_json()["book"]
+        assert book["bids"] == [[100.0, 1.0]]
+
+        client.post("/api/v1/orders", json=_order("SELL", 101.0, 2.0))
+        deltas = ws.receive_json()["deltas"]
+        assert [(d["seq"], d["side"], d["price"], d["quantity"]) for d in deltas] == [
+            (book["seq"] + 1, "SELL", 101.0, 2.0),
+        ]
+
+
+def test_snapshot_and_delta_streams_both_see_every_change(client):
+    client.post("/api/v1/orders", json=_order("BUY", 100.0))
+    with client.websocket_connect("/api/v1/marketdata") as snapshots, \
+            client.websocket_connect("/api/v1/marketdata?mode=delta") as deltas:
+        snapshots.receive_text()
+        seq = deltas.receive_json()["book"]["seq"]
+
+        # Both publishers share the book's notifier; neither may consume a
+        # wakeup the other is waiting for
+        for i in range(5):
+            price = 101.0 + i
+            client.post("/api/v1/orders", json=_order("SELL", price))
+
+            delta = deltas.receive_json()["deltas"][-1]
+            assert (delta["seq"], delta["price"]) == (seq + i + 1, price)
+
+            asks = []
+            while len(asks) < i + 1:
+                asks = json.loads(snapshots.receive_text())["snapshot"]["asks"]
+            assert asks[-1] == {"price": price, "quantity": 1.0}
+
+
+def test_notifier_wakes_every_listener_on_every_change():
+    async def main():
+        book = matching_engine.OrderBook("TEST-N")
+        notifier = BookNotifier(book, asyncio.get_running_loop())
+        first, second = asyncio.Event(), asyncio.Event()
+        notifier.add_listener(first)
+        notifier.add_listener(second)
+        try:
+            for price in (100.0, 101.0, 102.0):
+                book.add_order(price, 1.0, "BUY", "LIMIT")
+                await asyncio.wait_for(first.wait(), 1)
+                await asyncio.wait_for(second.wait(), 1)
+                # Listeners wake and clear independently
+                first.clear()
+                second.clear()
+        finally:
+            notifier.close()
+
+    asyncio.run(main())
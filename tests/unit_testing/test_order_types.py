@@ -0,0 +1,56 @@
+import random
+import pytest
+import matching_engine
+
+from tests.unit_testing.test_price_ladder import Pair, _random_session
+
+BUY = matching_engine.Side.BUY
+SELL = matching_engine.Side.SELL
+LIMIT = matching_engine.OrderType.LIMIT
+MARKET = matching_engine.OrderType.MARKET
+IOC = matching_engine.OrderType.IOC
+FOK = matching_engine.OrderType.FOK
+
+
+@pytest.fixture
+def book():
+    book = matching_engine.OrderBook("TEST-OT")
+    book.add_order(100.0, 1.0, SELL, LIMIT)
+    book.add_order(101.0, 1.0, SELL, LIMIT)
+    return book
+
+
+@pytest.mark.parametrize("order_type", [IOC, "IOC"])
+def test_ioc_respects_limit_and_never_rests(book, order_type):
+    side = BUY if order_type == IOC else "BUY"
+    fills = book.add_order(100.0, 2.0, side, order_type).trades
+    assert [(t.price, t.quantity) for t in fills] == [(100.0, 1.0)]
+    assert book.get_bbo() == ((0.0, 0.0), (101.0, 1.0))
+
+
+@pytest.mark.parametrize("order_type", [FOK, "FOK"])
+def test_fok_fills_entirely_or_not_at_all(book, order_type):
+    side = BUY if order_type == FOK else "BUY"
+    assert book.add_order(100.0, 2.0, side, order_type).trade_count == 0
+    assert book.get_bbo() == ((0.0, 0.0), (100.0, 1.0))
+
+    fills = book.add_order(101.0, 2.0, side, order_type).trades
+    assert [(t.price, t.quantity) for t in fills] == [(100.0, 1.0), (101.0, 1.0)]
+    assert book.get_bbo() == ((0.0, 0.0), (0.0, 0.0))
+
+
+def test_market_ignores_price(book):
+    assert book.add_order(1.0, 2.0, "BUY", "MARKET").trade_count == 2
+
+
+def test_unknown_side_or_type_rejected(book):
+    with pytest.raises(ValueError):
+        book.add_order(100.0, 1.0, "BUY", "STOP")
+    with pytest.raises(ValueError):
+        book.add_order(100.0, 1.0, "HOLD", "LIMIT")
+    assert book.get_bbo() == ((0.0, 0.0), (100.0, 1.0))
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_ioc_fok_ladder_matches_tree(seed):
+    _random_session(Pair(64), random.Random(seed), 2000, (LIMIT, LIMIT, MARKET, IOC, FOK))
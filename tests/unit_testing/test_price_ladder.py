@@ -0,0 +1,112 @@
+import random
+import pytest
+import matching_engine
+
+BUY = matching_engine.Side.BUY
+SELL = matching_engine.Side.SELL
+LIMIT = matching_engine.OrderType.LIMIT
+MARKET = matching_engine.OrderType.MARKET
+IOC = matching_engine.OrderType.IOC
+FOK = matching_engine.OrderType.FOK
+
+TICK = 0.01
+
+
+class Pair:
+    """A dense-ladder book and a tree-only book fed identical requests.
+
+    Order IDs come from a process-wide counter, so each book's IDs are
+    mapped back to the request that created them before comparing fills.
+    """
+
+    def __init__(self, ladder_levels: int):
+        self.ladder = matching_engine.OrderBook("TEST-LADDER", ladder_levels=ladder_levels)
+        self.tree = matching_engine.OrderBook("TEST-TREE", ladder_levels=0)
+        self.ids = []  # Request index -> (ladder order ID, tree order ID)
+        self.index = ({}, {})
+
+    def add(self, price, quantity, side, order_type):
+        results = [book.add_order(price, quantity, side, order_type) for book in (self.ladder, self.tree)]
+        for book_index, result in enumerate(results):
+            self.index[book_index][result.order_id] = len(self.ids)
+        self.ids.append((results[0].order_id, results[1].order_id))
+        self.assert_fills(results[0].trades, results[1].trades)
+
+    def cancel(self, request):
+        ladder_id, tree_id = self.ids[request]
+        assert self.ladder.cancel_order(ladder_id) == self.tree.cancel_order(tree_id)
+
+    def modify(self, request, quantity, price):
+        ladder_id, tree_id = self.ids[request]
+        ladder_fills = self.ladder.modify_order(ladder_id, quantity, price)
+        tree_fills = self.tree.modify_order(tree_id, quantity, price)
+        assert (ladder_fills is None) == (tree_fills is None)
+        if ladder_fills is not None:
+            self.assert_fills(ladder_fills, tree_fills)
+
+    def assert_fills(self, ladder_fills, tree_fills):
+        def key(book_index, t):
+            return (self.index[book_index][t.maker_order_id], self.index[book_index][t.taker_order_id],
+                    t.price, t.quantity, t.aggressor_side)
+        assert [key(0, t) for t in ladder_fills] == [key(1, t) for t in tree_fills]
+
+    def assert_same_book(self):
+        ladder_levels = self.ladder.get_levels()[1:]
+        tree_levels = self.tree.get_levels()[1:]
+        for ladder_side, tree_side in zip(ladder_levels, tree_levels):
+            assert ladder_side.tolist() == tree_side.tolist()
+        assert self.ladder.get_bbo() == self.tree.get_bbo()
+
+
+def _random_session(pair: Pair, rng: random.Random, steps: int, order_types):
+    # A random-walking mid drags the touch across many windows, forcing
+    # re-centers; wide spreads put levels outside the window (tree spill-over)
+    mid = 1000.0
+    for step in range(steps):
+        mid = max(5.0, mid + rng.choice((-1, 1)) * rng.randint(0, 40) * TICK)
+        roll = rng.random()
+        if roll < 0.15 and pair.ids:
+            pair.cancel(rng.randrange(len(pair.ids)))
+        elif roll < 0.25 and pair.ids:
+            price = round(mid + rng.randint(-300, 300) * TICK, 2)
+            pair.modify(rng.randrange(len(pair.ids)), rng.randint(1, 5), price)
+        else:
+            side = rng.choice((BUY, SELL))
+            offset = rng.randint(-5, 600 if rng.random() < 0.2 else 80) * TICK
+            price = round(mid - offset if side == BUY else mid + offset, 2)
+            pair.add(max(price, TICK), rng.randint(1, 5), side, rng.choice(order_types))
+        if step % 10 == 0:
+            pair.assert_same_book()
+    pair.assert_same_book()
+
+
+@pytest.mark.parametrize("seed", range(6))
+@pytest.mark.parametrize("ladder_levels", [64, 1000])
+def test_ladder_matches_tree(seed, ladder_levels):
+    _random_session(Pair(ladder_levels), random.Random(seed), 3000, (LIMIT, LIMIT, LIMIT, MARKET))
+
+
+@pytest.mark.parametrize("ladder_levels", [64, 1000])
+def test_ladder_drains_and_refills(ladder_levels):
+    pair = Pair(ladder_levels)
+    # Spread levels far beyond the window on both sides, so most live in the tree
+    for i in range(200):
+        pair.add(round(1000 - i * 0.5, 2), 1, BUY, LIMIT)
+        pair.add(round(1001 + i * 0.5, 2), 1, SELL, LIMIT)
+    pair.assert_same_book()
+
+    # Sweep through the array and well into the tree on each side
+    for side in (BUY, SELL):
+        for _ in range(15):
+            pair.add(0.0, 10, side, MARKET)
+            pair.assert_same_book()
+
+    # Drain completely, then rebuild somewhere else entirely
+    pair.add(0.0, 10_000, BUY, MARKET)
+    pair.add(0.0, 10_000, SELL, MARKET)
+    pair.assert_same_book()
+    assert pair.ladder.get_bbo() == ((0.0, 0.0), (0.0, 0.0))
+    for i in range(100):
+        pair.add(round(50 + i * 0.03, 2), 1, BUY, LIMIT)
+        pair.add(round(60 + i * 0.03, 2), 1, SELL, LIMIT)
+    pair.assert_same_book()
@@ -0,0 +1,77 @@
+import math
+import pytest
+import matching_engine
+
+BUY = matching_engine.Side.BUY
+SELL = matching_engine.Side.SELL
+LIMIT = matching_engine.OrderType.LIMIT
+MARKET = matching_engine.OrderType.MARKET
+
+
+@pytest.fixture
+def book():
+    return matching_engine.OrderBook("TEST-PV")
+
+
+def test_off_tick_buy_rounds_down(book):
+    book.add_order(100.01, 1.0, SELL, LIMIT)
+    assert book.add_order(100.005, 1.0, BUY, LIMIT).trade_count == 0
+    assert book.get_bbo()[0] == (100.0, 1.0)
+
+
+def test_off_tick_sell_rounds_up(book):
+    book.add_order(99.99, 1.0, BUY, LIMIT)
+    assert book.add_order(99.995, 1.0, SELL, LIMIT).trade_count == 0
+    assert book.get_bbo()[1] == (100.0, 1.0)
+
+
+def test_buy_under_one_tick_rejected(book):
+    with pytest.raises(ValueError):
+        book.add_order(0.001, 1.0, BUY, LIMIT)
+
+
+def test_on_tick_prices_are_exact(book):
+    book.add_order(100.01, 1.0, SELL, LIMIT)
+    fills = book.add_order(100.01, 1.0, BUY, LIMIT).trades
+    assert [t.price for t in fills] == [pytest.approx(100.01)]
+
+
+@pytest.mark.parametrize("price", [math.nan, math.inf, -math.inf, 1e300, -1.0, 0.0])
+def test_invalid_limit_prices_rejected(book, price):
+    book.add_order(100.0, 1.0, BUY, LIMIT)
+    with pytest.raises(ValueError):
+        book.add_order(price, 1.0, SELL, LIMIT)
+    assert book.get_bbo() == ((100.0, 1.0), (0.0, 0.0))
+
+
+@pytest.mark.parametrize("quantity", [math.nan, math.inf, 1e-10, 0.0, -1.0, 1e300])
+def test_invalid_quantities_rejected(book, quantity):
+    with pytest.raises(ValueError):
+        book.add_order(100.0, quantity, BUY, LIMIT)
+    with pytest.raises(ValueError):
+        book.add_order(0.0, quantity, SELL, MARKET)
+
+
+def test_market_orders_ignore_price(book):
+    book.add_order(100.0, 1.0, BUY, LIMIT)
+    assert book.add_order(0.0, 1.0, SELL, MARKET).trade_count == 1
+
+
+def test_invalid_batch_rejected_whole(book):
+    with pytest.raises(ValueError):
+        book.add_orders([100.0, math.nan], [1.0, 1.0], [int(BUY), int(SELL)], [int(LIMIT), int(LIMIT)])
+    assert book.get_bbo() == ((0.0, 0.0), (0.0, 0.0))
+
+
+def test_invalid_modify_rejected(book):
+    order_id = book.add_order(100.0, 1.0, BUY, LIMIT).order_id
+    with pytest.raises(ValueError):
+        book.modify_order(order_id, 1.0, math.nan)
+    assert book.get_bbo()[0] == (100.0, 1.0)
+
+
+@pytest.mark.parametrize("price, quantity", [("nan", 1), ("inf", 1), (100, "nan"), (1e300, 1), (100, 1e-10)])
+def test_route_rejects_invalid_numbers(client, price, quantity):
+    order = {"symbol": "BTC-USD", "side": "SELL", "order_type": "LIMIT", "price": price, "quantity": quantity}
+    assert client.post("/api/v1/orders", json=order).json()["order"]["status"] == "error"
+    assert client.post("/api/v1/orders", json=[order]).json()["orders"][0]["status"] == "error"
@@ -0,0 +1,81 @@
+import struct
+import time
+import pytest
+import matching_engine
+
+BUY = matching_engine.Side.BUY
+SELL = matching_engine.Side.SELL
+LIMIT = matching_engine.OrderType.LIMIT
+
+
+def test_snapshot_callers_get_independent_dicts():
+    book = matching_engine.OrderBook("TEST-SNAP")
+    book.add_order(100.0, 1.0, BUY, LIMIT)
+
+    first = book.get_snapshot(5)
+    first["bids"].clear()
+    first["injected"] = True
+
+    second = book.get_snapshot(5)
+    assert second["bids"] == [{"price": 100.0, "quantity": 1.0}]
+    assert "injected" not in second
+
+
+def test_binary_snapshot_layout():
+    book = matching_engine.OrderBook("TEST-SNAP")
+    book.add_order(101.0, 1.0, SELL, LIMIT)
+    book.add_order(101.0, 0.5, BUY, LIMIT)  # A trade, for the book's symbol id
+    for price, quantity in ((100.0, 1.0), (99.5, 2.0)):
+        book.add_order(price, quantity, BUY, LIMIT)
+    book.add_order(102.0, 3.0, SELL, LIMIT)
+
+    data = book.get_snapshot_bytes(5, "binary")
+    layout, symbol_id, version, timestamp, bid_count, ask_count = struct.unpack_from("<B3xIQqII", data)
+    assert layout == 1
+    assert symbol_id == book.trades_after(0)["symbol_id"][0]
+    assert version == book.top_version
+    assert abs(timestamp / 1e6 - time.time()) < 60
+    assert (bid_count, ask_count) == (2, 2)
+
+    rows = struct.unpack_from(f"<{2 * (bid_count + ask_count)}d", data, 32)
+    assert len(data) == 32 + 8 * len(rows)
+    assert rows == (100.0, 1.0, 99.5, 2.0, 101.0, 0.5, 102.0, 3.0)
+
+
+def test_snapshot_bytes_rejects_unknown_format():
+    book = matching_engine.OrderBook("TEST-SNAP")
+    with pytest.raises(ValueError):
+        book.get_snapshot_bytes(5, "xml")
+
+
+def test_depth_is_sized_from_the_book_and_versioned_consistently():
+    book = matching_engine.OrderBook("TEST-SNAP")
+    book.add_order(100.0, 1.0, BUY, LIMIT)
+    book.add_order(101.0, 2.0, SELL, LIMIT)
+
+    bids, asks, version, _ = book.get_depth(0)
+    assert bids.shape == asks.shape == (0, 2)
+    assert version == book.top_version
+
+    for depth in (1, 16, 10_000_000):
+        bids, asks, depth_version, _ = book.get_depth(depth)
+        assert bids.tolist() == [[100.0, 1.0]]
+        assert asks.tolist() == [[101.0, 2.0]]
+        assert depth_version == version
+
+
+def test_snapshot_returns_exactly_depth_levels():
+    book = matching_engine.OrderBook("TEST-SNAP")
+    for price in (100.0, 99.0, 98.0):
+        book.add_order(price, 1.0, BUY, LIMIT)
+        book.add_order(price + 3.0, 1.0, SELL, LIMIT)
+
+    empty = book.get_snapshot(0)
+    assert empty["bids"] == [] and empty["asks"] == []
+    assert empty["bbo"]["bid"] == {"price": 100.0, "quantity": 1.0}
+    assert empty["bbo"]["ask"] == {"price": 101.0, "quantity": 1.0}
+
+    two = book.get_snapshot(2)
+    assert [level["price"] for level in two["bids"]] == [100.0, 99.0]
+    assert [level["price"] for level in two["asks"]] == [101.0, 102.0]
+    assert two["bbo"] == empty["bbo"] and two["version"] == empty["version"]
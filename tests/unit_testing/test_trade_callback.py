@@ -0,0 +1,62 @@
+import threading
+import numpy as np
+import pytest
+import matching_engine
+
+BUY = int(matching_engine.Side.BUY)
+LIMIT = int(matching_engine.OrderType.LIMIT)
+
+
+@pytest.fixture
+def book():
+    book = matching_engine.OrderBook("TEST-CB")
+    for _ in range(3):
+        book.add_order(100.0, 1.0, "SELL", "LIMIT")
+    return book
+
+
+def test_add_order_reports_all_its_fills_at_once(book):
+    calls = []
+    book.set_trade_batch_callback(lambda trades: calls.append(trades["seq"].tolist()))
+
+    book.add_order(100.0, 3.0, "BUY", "LIMIT")
+    assert calls == [[1, 2, 3]]
+
+    book.add_order(99.0, 1.0, "BUY", "LIMIT")  # Rests; no fills, no call
+    assert calls == [[1, 2, 3]]
+
+
+def test_add_orders_reports_the_whole_batch_at_once(book):
+    calls = []
+    book.set_trade_batch_callback(lambda trades: calls.append(trades["seq"].tolist()))
+
+    book.add_orders(np.array([100.0, 100.0]), np.array([1.0, 2.0]),
+                    np.array([BUY] * 2, dtype=np.uint8),
+                    np.array([LIMIT] * 2, dtype=np.uint8))
+    assert calls == [[1, 2, 3]]
+
+
+def test_callback_may_reenter_the_book(book):
+    seen = []
+
+    def on_trades(trades):
+        # Runs after the book lock is released, so this must not deadlock
+        seen.append(book.get_bbo())
+        if len(seen) == 1:
+            book.add_order(100.0, 1.0, "BUY", "LIMIT")
+
+    book.set_trade_batch_callback(on_trades)
+    thread = threading.Thread(target=book.add_order, args=(100.0, 1.0, "BUY", "LIMIT"), daemon=True)
+    thread.start()
+    thread.join(5)
+    assert not thread.is_alive()
+    assert len(seen) == 2
+
+
+def test_none_disables_the_callback(book):
+    calls = []
+    book.set_trade_batch_callback(calls.append)
+    book.add_order(100.0, 1.0, "BUY", "LIMIT")
+    book.set_trade_batch_callback(None)
+    book.add_order(100.0, 1.0, "BUY", "LIMIT")
+    assert len(calls) == 1
@@ -0,0 +1,298 @@
+import asyncio
+import json
+import matching_engine
+import pytest
+from starlette.websockets import WebSocketDisconnect
+
+from app.books import books
+from app.routes import tradedata_routes
+from app.utils.outbox import Outbox
+
+
+def _order(side, price, quantity=1.0, order_type="LIMIT"):
+    return {"symbol": "BTC-USD", "side": side, "order_type": order_type, "price": price, "quantity": quantity}
+
+
+def _trade(frame: str) -> dict:
+    message = json.loads(frame)
+    assert list(message) == ["trade"]
+    return message["trade"]
+
+
+def test_sweep_larger_than_queue_reaches_per_trade_clients(client):
+    makers = tradedata_routes.TRADE_QUEUE_SIZE + 904
+    client.post("/api/v1/orders", json=[_order("SELL", 100.0) for _ in range(makers)])
+    with client.websocket_connect("/api/v1/trades") as ws:
+        client.post("/api/v1/orders", json=_order("BUY", 100.0, makers, "MARKET"))
+
+        received = [_trade(ws.receive_text()) for _ in range(makers)]
+        assert [t["seq"] for t in received] == list(range(received[0]["seq"], received[0]["seq"] + makers))
+
+        # Still subscribed: the next trade arrives as a normal frame
+        client.post("/api/v1/orders", json=_order("SELL", 100.0))
+        client.post("/api/v1/orders", json=_order("BUY", 100.0))
+        assert _trade(ws.receive_text())["seq"] == received[-1]["seq"] + 1
+
+
+@pytest.mark.parametrize("batch_ms", [0, 1, 5])
+def test_batched_clients_get_one_frame_per_sweep(client, batch_ms):
+    client.post("/api/v1/orders", json=[_order("SELL", 100.0) for _ in range(3)])
+    with client.websocket_connect(f"/api/v1/trades?batch_ms={batch_ms}") as ws:
+        client.post("/api/v1/orders", json=_order("BUY", 100.0, 3, "MARKET"))
+        trades = json.loads(ws.receive_text())["trades"]
+        assert [t["seq"] for t in trades] == [1, 2, 3]
+
+
+@pytest.mark.parametrize("batch_ms", ["6", "-1", "x"])
+def test_invalid_batch_ms_is_rejected(client, batch_ms):
+    with pytest.raises(WebSocketDisconnect) as closed:
+        with client.websocket_connect(f"/api/v1/trades?batch_ms={batch_ms}") as ws:
+            ws.receive_text()
+    assert closed.value.code == 1008
+
+
+class _StuckSocket:
+    """A websocket whose client never reads, so frames stay queued."""
+
+    client = "stuck"
+
+    async def send_text(self, frame):
+        await asyncio.Event().wait()
+
+    async def close(self, code=1000, reason=None):
+        pass
+
+
+def test_only_clients_already_behind_are_disconnected():
+    async def main():
+        hub = tradedata_routes.TradeHub("TEST-T")
+        behind, caught_up = _StuckSocket(), _StuckSocket()
+        hub.subscribers = {behind: Outbox(behind, limit=4), caught_up: Outbox(caught_up, limit=4)}
+        hub.batch_ms = {behind: None, caught_up: None}
+        await asyncio.sleep(0)
+        hub.subscribers[behind].put(*["{}"] * 5, force=True)
+        await asyncio.sleep(0)  # One frame is taken by the stuck sender
+
+        outbox = hub.subscribers[caught_up]
+        hub._fan_out_each([{"seq": seq} for seq in range(1, 11)])
+        assert list(hub.subscribers) == [caught_up]
+        # The whole sweep is queued even though it is larger than the limit
+        assert [json.loads(frame)["trade"]["seq"] for frame in outbox.frames] == list(range(1, 11))
+        outbox.close()
+        await asyncio.sleep(0)
+
+    asyncio.run(main())
+
+
+class _RecordingSocket:
+    """A websocket that keeps every frame the hub sends it."""
+
+    client = "recording"
+
+    def __init__(self):
+        self.frames = []
+
+    async def send_text(self, frame):
+        self.frames.append(json.loads(frame))
+
+    async def close(self, code=1000, reason=None):
+        pass
+
+    def seqs(self) -> list[int]:
+        seqs = []
+        for frame in self.frames:
+            seqs += [t["seq"] for t in frame["trades"]] if "trades" in frame else [frame["trade"]["seq"]]
+        return seqs
+
+
+def _cross(book, count):
+    """Match `count` trades, each its own fill."""
+    for _ in range(count):
+        book.add_order(100.0, 1.0, "SELL", "LIMIT")
+    book.add_order(100.0, float(count), "BUY", "LIMIT")
+
+
+async def _settle(hub):
+    hub._on_readable()
+    for _ in range(3):
+        await asyncio.sleep(0)
+
+
+def _run_hub(test, **book_args):
+    """Run `test(hub, book)` on a fresh loop with the hub's book already created."""
+    async def main():
+        if book_args:
+            books.order_books["TEST-T"] = matching_engine.OrderBook("TEST-T", **book_args)
+        hub = tradedata_routes.TradeHub("TEST-T")
+        live = _RecordingSocket()
+        hub.subscribe(live)  # Keeps trade events enabled throughout
+        try:
+            await test(hub, books.get_or_create_book("TEST-T"))
+        finally:
+            for ws in list(hub.subscribers):
+                hub.unsubscribe(ws)
+
+    asyncio.run(main())
+
+
+def test_replay_hands_over_to_live_without_gap_or_duplicate(reset_app):
+    async def test(hub, book):
+        _cross(book, 5)
+        await _settle(hub)
+
+        replayed = _RecordingSocket()
+        hub.subscribe(replayed, since_seq=2)
+        _cross(book, 2)
+        await _settle(hub)
+        assert "trades" in replayed.frames[0]
+        assert replayed.seqs() == [3, 4, 5, 6, 7]
+
+    _run_hub(test)
+
+
+def test_replay_from_ahead_of_the_stream_sends_only_live_trades(reset_app):
+    async def test(hub, book):
+        _cross(book, 3)
+        await _settle(hub)
+
+        ahead = _RecordingSocket()
+        hub.subscribe(ahead, since_seq=100)
+        _cross(book, 1)
+        await _settle(hub)
+        assert ahead.frames == [{"trade": ahead.frames[0]["trade"]}]
+        assert ahead.seqs() == [4]
+
+    _run_hub(test)
+
+
+def test_replay_past_the_history_sends_a_gap(reset_app):
+    async def test(hub, book):
+        _cross(book, 6)
+        await _settle(hub)
+
+        late = _RecordingSocket()
+        hub.subscribe(late, since_seq=0)
+        await _settle(hub)
+        assert late.frames == [{"gap": {"after_seq": 0, "seq": 6}}]
+
+    _run_hub(test, trade_history=4)
+
+
+def test_replay_larger_than_the_queue_sends_a_gap(reset_app, monkeypatch):
+    monkeypatch.setattr(tradedata_routes, "TRADE_QUEUE_SIZE", 2)
+    monkeypatch.setattr(tradedata_routes, "DRAIN_BATCH", 2)
+
+    async def test(hub, book):
+        _cross(book, 5)
+        await _settle(hub)
+
+        behind = _RecordingSocket()
+        hub.subscribe(behind, since_seq=0)
+        await _settle(hub)
+        assert behind.frames == [{"gap": {"after_seq": 0, "seq": 5}}]
+
+    _run_hub(test)
+
+
+def test_replay_stops_where_the_pending_window_starts(reset_app):
+    async def test(hub, book):
+        windowed = _RecordingSocket()
+        hub.subscribe(windowed, batch_ms=5)
+        _cross(book, 2)
+        await _settle(hub)
+        await asyncio.sleep(0.02)  # Flushed
+
+        _cross(book, 2)
+        await _settle(hub)
+        assert hub.pending[5][0]["seq"] == 3
+
+        # Seqs 1-2 come from the history, 3-4 from the window's flush
+        joining = _RecordingSocket()
+        hub.subscribe(joining, batch_ms=5, since_seq=0)
+        await asyncio.sleep(0.02)
+        await _settle(hub)
+        assert joining.seqs() == [1, 2, 3, 4]
+        assert windowed.seqs() == [1, 2, 3, 4]
+
+    _run_hub(test)
+
+
+def test_ring_overflow_is_filled_in_from_history(reset_app, monkeypatch):
+    monkeypatch.setattr(tradedata_routes, "TRADE_EVENT_CAPACITY", 4)
+
+    async def test(hub, book):
+        _cross(book, 10)
+        assert book.trade_events_dropped > 0
+        await _settle(hub)
+        live = next(iter(hub.subscribers))
+        assert live.seqs() == list(range(1, 11))
+
+    _run_hub(test)
+
+
+def test_gap_inside_a_drained_batch_is_filled_in_from_history(reset_app, monkeypatch):
+    monkeypatch.setattr(tradedata_routes, "TRADE_EVENT_CAPACITY", 4)
+
+    async def test(hub, book):
+        _cross(book, 4)
+        _cross(book, 2)  # Ring full: seqs 5-6 dropped
+        book.drain_trade_events(4)  # Seqs 1-4 leave the ring without reaching the hub
+        _cross(book, 2)
+        await _settle(hub)
+        live = next(iter(hub.subscribers))
+        assert live.seqs() == list(range(1, 9))
+
+    _run_hub(test)
+
+
+def test_window_coalesces_trades_from_separate_wakeups(reset_app):
+    async def test(hub, book):
+        per_loop, windowed = _RecordingSocket(), _RecordingSocket()
+        hub.subscribe(per_loop, batch_ms=0)
+        hub.subscribe(windowed, batch_ms=5)
+        for _ in range(3):
+            _cross(book, 2)
+            await _settle(hub)
+        await asyncio.sleep(0.02)
+        await _settle(hub)
+        assert [len(frame["trades"]) for frame in per_loop.frames] == [2, 2, 2]
+        assert [len(frame["trades"]) for frame in windowed.frames] == [6]
+
+    _run_hub(test)
+
+
+def test_framings_share_one_encode(reset_app, monkeypatch):
+    async def test(hub, book):
+        first, second = _RecordingSocket(), _RecordingSocket()
+        hub.subscribe(first, batch_ms=0)
+        hub.subscribe(second, batch_ms=0)
+        hub.subscribe(_RecordingSocket(), batch_ms=5)
+        encode = hub._encode
+        encoded = []
+        monkeypatch.setattr(hub, "_encode", lambda batch: encoded.append(len(batch)) or encode(batch))
+
+        _cross(book, 3)
+        hub._on_readable()
+        assert encoded == [3]
+        # Clients on one framing are sent the very same frame
+        assert hub.subscribers[first].frames[0] is hub.subscribers[second].frames[0]
+
+    _run_hub(test)
+
+
+def test_unsubscribe_cancels_pending_flushes(reset_app):
+    async def test(hub, book):
+        windowed = _RecordingSocket()
+        hub.subscribe(windowed, batch_ms=5)
+        _cross(book, 1)
+        await _settle(hub)
+        flush = hub.flushes[5]
+
+        for ws in list(hub.subscribers):
+            hub.unsubscribe(ws)
+        assert flush.cancelled()
+        assert not hub.flushes and not hub.pending
+        await asyncio.sleep(0.02)
+        assert windowed.frames == []
+
+    _run_hub(test)